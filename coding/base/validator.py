@@ -29,7 +29,7 @@ from traceback import print_exception
 
 from coding.mock import MockDendrite
 from coding.base.neuron import BaseNeuron
-from coding.constants import BLACKLISTED_COLDKEYS
+from coding.constants import BLACKLISTED_COLDKEYS, SCORE_THRESHOLD_MARGIN
 from coding.utils.config import add_validator_args
 from coding.utils.exceptions import MaxRetryError
 
@@ -363,7 +363,7 @@ class BaseValidatorNeuron(BaseNeuron):
             finetune_scores[tracker.uid] = tracker.score
 
         max_score = np.max(finetune_scores)
-        threshold = max_score - 0.17  # within 0.18 of max score
+        threshold = max_score - SCORE_THRESHOLD_MARGIN  # within 0.18 of max score
         finetune_scores[finetune_scores < threshold] = 0
         if np.all(finetune_scores == 0):
             bt.logging.warning("finetune_scores is all 0's, skipping update_scores.")
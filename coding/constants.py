@@ -68,6 +68,9 @@ DISALLOWED_IMPORTS = [
 NUM_ALLOWED_CHARACTERS = 1000000
 IMAGE_VERSION = "2.0"
 
+# miners scoring more than this below the top score get zeroed
+SCORE_THRESHOLD_MARGIN = 0.17
+
 
 BLACKLISTED_COLDKEYS = [
     "5HZBQNezW75BozcFzA43a55vNBFZapvrtvRU4CZDPEoa9mWg" # Blacklisted for repeatedly exploiting
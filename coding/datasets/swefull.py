@@ -1,4 +1,5 @@
 import os
+from collections import defaultdict
 from datasets import load_dataset
 
 from .base import Dataset
@@ -10,7 +11,17 @@ class SWEFullDataset(Dataset):
 
     def __init__(
         self,
+        max_images: int | None = None,
+        scan_limit: int = 200,
     ):
+        """
+        Args:
+            max_images (int | None): If set, only sample instances from at most this many
+                distinct (repo, version) images, spreading the samples evenly across them.
+                If None, instances are sampled uniformly.
+            scan_limit (int): How many rows to scan looking for the least sampled image
+                before settling for another one.
+        """
         if os.getenv("PRINCETON_SWE_BENCH_LOCATION", None) is not None:
             self.dataset = load_dataset(
                 os.getenv("PRINCETON_SWE_BENCH_LOCATION"), split="test"
@@ -21,9 +32,62 @@ class SWEFullDataset(Dataset):
                 "princeton-nlp/SWE-bench", split="test", streaming=True
             ).shuffle()
         self.dataset_iterset = iter(self.dataset)
+        self.max_images = max_images
+        self.scan_limit = scan_limit
+        # (repo, version) images that samples are drawn from, and how often each was used
+        self.image_keys = []
+        self.image_counts = defaultdict(int)
+        self.buffers = defaultdict(list)
+        self.exhausted = False
+
+    def prefer_images(self, image_keys: list[tuple[str, str]]):
+        """
+        Add (repo, version) images that are already in use, they count towards max_images.
+        """
+        for image_key in image_keys:
+            if image_key not in self.image_keys:
+                self.image_keys.append(image_key)
+
+    def _accepts_image(self, image_key: tuple[str, str], scanned: int) -> bool:
+        if self.max_images is not None and len(self.image_keys) >= self.max_images:
+            return False
+        # keep repo diversity, only add another version of a repo if no new repos turn up
+        repos = {repo for repo, _ in self.image_keys}
+        return image_key[0] not in repos or scanned >= self.scan_limit // 2
+
+    def _next_row(self) -> dict:
+        if self.max_images is None:
+            return next(self.dataset_iterset)
+
+        scanned = 0
+        while True:
+            ready = [key for key in self.image_keys if self.buffers[key]]
+            least_used = min(
+                self.image_keys, key=lambda key: self.image_counts[key], default=None
+            )
+            if ready and (
+                self.buffers[least_used] or scanned >= self.scan_limit or self.exhausted
+            ):
+                image_key = min(ready, key=lambda key: self.image_counts[key])
+                self.image_counts[image_key] += 1
+                return self.buffers[image_key].pop(0)
+            if self.exhausted:
+                raise StopIteration
+
+            row = next(self.dataset_iterset, None)
+            if row is None:
+                self.exhausted = True
+                continue
+            scanned += 1
+            image_key = (row["repo"], row["version"])
+            if image_key in self.image_keys:
+                self.buffers[image_key].append(row)
+            elif self._accepts_image(image_key, scanned):
+                self.image_keys.append(image_key)
+                self.buffers[image_key].append(row)
 
     def get(self, n=100, selector: Selector = Selector()) -> dict:
-        row = next(self.dataset_iterset)
+        row = self._next_row()
         return {
             "topic": row["problem_statement"],
             "title": row["repo"],
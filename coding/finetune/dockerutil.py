@@ -1,17 +1,74 @@
+import io
 import os
 import ast
 import json
 import time
+import tarfile
 import docker
 import tempfile
 import threading
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from collections import OrderedDict
+from typing import Dict, List, Tuple
 
 from coding.constants import COMPETITION_ID
+from .model import logic_hash
 from ..helpers.git import GitRepo
+from .pool import CONTAINER_POOL
+from .reaper import container_labels
 
 
-def exec_container_with_timeout(container, command, timeout):
+# by default the first 1MB and the last 4MB of an exec's output are kept
+DEFAULT_CAPTURE_HEAD_BYTES = 1024 * 1024
+DEFAULT_CAPTURE_TAIL_BYTES = 4 * 1024 * 1024
+
+
+class OutputCapture:
+    """
+    Bounded capture of a stream of output.
+
+    Keeps the first `head_bytes` and the last `tail_bytes` of the output, anything in
+    between is dropped.
+    """
+
+    def __init__(
+        self,
+        head_bytes: int = DEFAULT_CAPTURE_HEAD_BYTES,
+        tail_bytes: int = DEFAULT_CAPTURE_TAIL_BYTES,
+    ):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.total_bytes = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, chunk: bytes):
+        self.total_bytes += len(chunk)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk:
+            self._tail += chunk
+            # trim lazily so the tail is not shifted on every chunk
+            if len(self._tail) > 2 * self.tail_bytes:
+                del self._tail[: len(self._tail) - self.tail_bytes]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > len(self._head) + len(self._tail[-self.tail_bytes :])
+
+    def getvalue(self) -> bytes:
+        tail = bytes(self._tail[-self.tail_bytes :])
+        if not self.truncated:
+            return bytes(self._head) + tail
+        dropped = self.total_bytes - len(self._head) - len(tail)
+        return bytes(self._head) + f"\n... [{dropped} bytes truncated] ...\n".encode() + tail
+
+
+def exec_container_with_timeout(
+    container, command, timeout, environment=None, capture: OutputCapture | None = None
+):
     """
     Executes a command in a Docker container with a timeout.
 
@@ -19,21 +76,28 @@ def exec_container_with_timeout(container, command, timeout):
         container: The Docker container object.
         command: The command to execute.
         timeout: Timeout in seconds.
+        environment: Environment variables for the command.
+        capture: Capture the output is streamed into, a default one is used if not given.
 
     Returns:
-        Tuple of exec result and logs.
+        Tuple of exit code and the captured logs.
 
     Raises:
         TimeoutError: If the command takes longer than the timeout.
     """
     exec_result = None
-    logs = None
+    capture = capture if capture is not None else OutputCapture()
     exception = None
 
     def target():
-        nonlocal exec_result, logs, exception
+        nonlocal exec_result, exception
         try:
-            exec_result, logs = container.exec_run(command)
+            exec_id = container.client.api.exec_create(
+                container.id, command, environment=environment
+            )["Id"]
+            for chunk in container.client.api.exec_start(exec_id, stream=True):
+                capture.write(chunk)
+            exec_result = container.client.api.exec_inspect(exec_id)["ExitCode"]
         except Exception as e:
             exception = e
 
@@ -57,7 +121,7 @@ def exec_container_with_timeout(container, command, timeout):
     if exception:
         raise exception
 
-    return exec_result, logs
+    return exec_result, capture.getvalue()
 
 
 def build_docker_container(logic_files: dict, hotkey: str, repo_files: dict) -> str:
@@ -158,6 +222,7 @@ def run_docker_container(
             detach=True,
             ports={"3000/tcp": 3000},
             extra_hosts={"host.docker.internal": "host-gateway"},
+            labels=container_labels("logic", tracker=hotkey),
             environment={
                 "HOST_IP": os.getenv("HOST_IP", "localhost"),
                 "ISSUE_DESCRIPTION": issue_description,
@@ -198,146 +263,300 @@ def run_docker_container(
         raise
 
 
+# logic bundles are small, a handful covers every tracker being evaluated at once
+LOGIC_BUNDLE_CACHE_SIZE = 32
+_logic_bundles: OrderedDict = OrderedDict()
+_logic_bundles_lock = threading.Lock()
+
+
+def build_logic_bundle(logic_files: dict) -> bytes:
+    """
+    Pack the logic files and the swe-server runner into an in-memory tar rooted at /.
+
+    Args:
+        logic_files (dict): Dictionary mapping filenames to file contents
+
+    Returns:
+        bytes: Tar archive that extracts to /app/code
+    """
+    files = {
+        filename: content.encode("latin-1") for filename, content in logic_files.items()
+    }
+    # the runner files take precedence over logic files with the same name
+    swe_server_path = Path(__file__).parent / "swe-server"
+    for item in sorted(swe_server_path.rglob("*")):
+        if item.is_file() and "__pycache__" not in item.parts:
+            files[item.relative_to(swe_server_path).as_posix()] = item.read_bytes()
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        directories = {"app", "app/code"}
+        for filename in files:
+            parent = PurePosixPath("app/code", filename).parent
+            while str(parent) not in (".", "app"):
+                directories.add(str(parent))
+                parent = parent.parent
+        for directory in sorted(directories):
+            info = tarfile.TarInfo(name=directory)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            tar.addfile(info)
+        for filename, data in files.items():
+            info = tarfile.TarInfo(name=f"app/code/{filename}")
+            info.size = len(data)
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+    return archive.getvalue()
+
+
+def logic_bundle(logic_files: dict) -> bytes:
+    """
+    Get the bundle of the logic, packing it only the first time it is asked for.
+    """
+    digest = logic_hash(logic_files)
+    with _logic_bundles_lock:
+        if digest in _logic_bundles:
+            _logic_bundles.move_to_end(digest)
+            return _logic_bundles[digest]
+    bundle = build_logic_bundle(logic_files)
+    with _logic_bundles_lock:
+        _logic_bundles[digest] = bundle
+        while len(_logic_bundles) > LOGIC_BUNDLE_CACHE_SIZE:
+            _logic_bundles.popitem(last=False)
+    return bundle
+
+
+# must match RESULT_PATH in swe-server/runner.py
+RUNNER_RESULT_PATH = "/tmp/swe_result.json"
+MAX_RESULT_BYTES = 16 * 1024 * 1024
+# bytes of the head and of the tail of the runner logs that are kept by default
+TRUNCATED_LOG_BYTES = 16 * 1024
+# seconds a logic may run on a task that has no recorded runtimes yet
+DEFAULT_RUNNER_TIMEOUT = 1200
+
+
+def read_container_file(container, path: str, max_bytes: int = MAX_RESULT_BYTES) -> bytes:
+    """
+    Read a single file from a container with get_archive.
+
+    Args:
+        container: The container to read from
+        path (str): Absolute path of the file
+        max_bytes (int): Files larger than this are not read
+
+    Returns:
+        bytes: Content of the file
+    """
+    bits, stat = container.get_archive(path)
+    if stat["size"] > max_bytes:
+        raise ValueError(f"{path} is {stat['size']} bytes, more than {max_bytes}")
+    archive = io.BytesIO()
+    for chunk in bits:
+        archive.write(chunk)
+    archive.seek(0)
+    with tarfile.open(fileobj=archive) as tar:
+        member = tar.next()
+        if member is None or not member.isfile():
+            raise ValueError(f"{path} is not a file")
+        return tar.extractfile(member).read()
+
+
+class LogicVolumes:
+    """
+    Named volumes holding a logic bundle, one per docker host and logic digest.
+
+    A volume is populated once and mounted read-only at /app/code by every container that
+    runs the logic, instead of copying the logic into each of them.
+    """
+
+    def __init__(self):
+        # (docker host, logic digest) -> volume name
+        self._volumes: Dict[Tuple[str, str], str] = {}
+        self._in_progress: Dict[Tuple[str, str], threading.Event] = {}
+        self._clients: Dict[str, docker.DockerClient] = {}
+        # volumes that were still in use when they were removed
+        self._pending_removal: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def get(self, client: docker.DockerClient, logic_files: dict, image_name: str) -> str:
+        """
+        Get the volume of the logic, creating it on the first call.
+
+        Args:
+            client (docker.DockerClient): Client of the docker host to run on
+            logic_files (dict): Dictionary mapping filenames to file contents
+            image_name (str): An image on the host, used to populate the volume
+
+        Returns:
+            str: Name of the volume
+        """
+        base_url = client.api.base_url
+        key = (base_url, logic_hash(logic_files))
+        while True:
+            with self._lock:
+                self._clients[base_url] = client
+                if key in self._volumes:
+                    return self._volumes[key]
+                event = self._in_progress.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._in_progress[key] = event
+                    break
+            event.wait()
+
+        try:
+            name = self._create(client, key[1], logic_files, image_name)
+            with self._lock:
+                self._volumes[key] = name
+            return name
+        finally:
+            with self._lock:
+                del self._in_progress[key]
+            event.set()
+
+    def _create(
+        self, client: docker.DockerClient, digest: str, logic_files: dict, image_name: str
+    ) -> str:
+        name = f"swe-logic-{digest[:16]}-{COMPETITION_ID}".lower()
+        # a volume left behind by an earlier run may have only been partially populated
+        try:
+            client.volumes.get(name).remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        client.volumes.create(name=name, labels={"swe-logic-digest": digest})
+        helper = client.containers.create(
+            image=image_name,
+            command="true",
+            volumes={name: {"bind": "/app/code", "mode": "rw"}},
+            labels=container_labels("logic-volume"),
+        )
+        try:
+            helper.put_archive("/", logic_bundle(logic_files))
+        finally:
+            helper.remove(force=True)
+        return name
+
+    def remove(self, digest: str):
+        """
+        Remove the volumes of a logic on every host, volumes still in use are retried later.
+        """
+        with self._lock:
+            keys = [key for key in self._volumes if key[1] == digest]
+            removals = self._pending_removal + [
+                (key[0], self._volumes.pop(key)) for key in keys
+            ]
+            self._pending_removal = []
+        for base_url, name in removals:
+            try:
+                self._clients[base_url].volumes.get(name).remove(force=True)
+            except docker.errors.NotFound:
+                pass
+            except Exception as e:
+                print(f"Could not remove volume {name}, retrying later: {e}")
+                with self._lock:
+                    self._pending_removal.append((base_url, name))
+
+    def clear(self):
+        """
+        Remove every volume that was created.
+        """
+        with self._lock:
+            digests = {key[1] for key in self._volumes}
+        for digest in digests:
+            self.remove(digest)
+        # no volume has digest None, this only retries the pending removals
+        self.remove(None)
+
+
+LOGIC_VOLUMES = LogicVolumes()
+
+
 def run_docker_container_from_base(
     image_name: str,
-    container_name: str,
-    repo: GitRepo,
     hotkey: str,
     issue_description: str,
     base_commit: str,
     logic_files: dict,
     client,
-    remote_host_url: str | None = None,
     api_key: str = "",
+    keep_logs: bool = False,
+    task_id: str | None = None,
+    timeout: int = DEFAULT_RUNNER_TIMEOUT,
 ) -> dict:
     """
-    Runs a Docker container for evaluating model logic.
+    Runs model logic in a container from the warm pool of the image.
 
     Args:
-        container_name (str): Name of the Docker container to run
-        repo (GitRepo): Git repository object containing code to evaluate
+        image_name (str): Image of the task
         hotkey (str): Unique identifier for the logic
         issue_description (str): Description of the issue to fix
+        base_commit (str): Commit /testbed is reset to
+        logic_files (dict): Dictionary mapping filenames to file contents
+        client (docker.DockerClient): Client of the docker host to run on
+        api_key (str): Key the logic uses for LLM requests
+        keep_logs (bool): Keep the full runner logs instead of a truncated head and tail
+        task_id (str): Instance id of the task, used to label the container
+        timeout (int): Seconds the logic may run before it is killed
 
     Returns:
         dict: The patch output from the container
     """
-    # Initialize Docker client
-    # container_name = f"swe-logic-{str(hotkey)}-{COMPETITION_ID}".lower()
-    with tempfile.TemporaryDirectory() as temp_dir:
-        code_dir = os.path.join(temp_dir, "code")
-        os.makedirs(code_dir)
-
-        # Write logic files to code directory
-        for filename, content in logic_files.items():
-            file_path = os.path.join(code_dir, filename)
-            # Create all parent directories
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            # Create the file and write content
-            with open(file_path, "w", encoding="latin-1") as f:
-                f.write(content)
-
-        # Write repo files to repo path
-        repo_dir = os.path.join(temp_dir, "repo")
-        for filename, content in repo.files.items():
-            file_path = os.path.join(repo_dir, filename)
-            # Create all parent directories
-            os.makedirs(os.path.dirname(file_path), exist_ok=True)
-            # Create the file and write content
-            with open(file_path, "w", encoding="latin-1") as f:
-                f.write(content)
-
-        # Copy Dockerfile and server files
-        swe_server_path = Path(__file__).parent / "swe-server"
-        for item in swe_server_path.glob("*"):
-            if item.is_file():
-                dest_path = os.path.join(code_dir, item.name)
-                with open(item, "rb") as src, open(dest_path, "wb") as dst:
-                    dst.write(src.read())
-            elif item.is_dir():
-                dest_dir = os.path.join(code_dir, item.name)
-                os.system(f"cp -r {item} {dest_dir}")
+    container = None
+    volumes = None
+    try:
+        volume = LOGIC_VOLUMES.get(client, logic_files, image_name)
+        volumes = {volume: {"bind": "/app/code", "mode": "ro"}}
+    except Exception as e:
+        print(f"Error creating the logic volume, copying the logic instead: {e}")
+    try:
+        # the pool hands out a started container with /testbed at the base commit
+        container = CONTAINER_POOL.acquire(
+            client,
+            image_name,
+            base_commit,
+            volumes=volumes,
+            labels=container_labels("logic", tracker=hotkey, task=task_id),
+        )
+        if volumes is None:
+            container.put_archive("/", logic_bundle(logic_files))
 
+        # the result is read from the runner's result file, logs are only kept for debugging
+        capture = OutputCapture() if keep_logs else OutputCapture(
+            head_bytes=TRUNCATED_LOG_BYTES, tail_bytes=TRUNCATED_LOG_BYTES
+        )
+        exec_result, logs = exec_container_with_timeout(
+            container,
+            "python3 -u /app/code/runner.py",
+            timeout,
+            environment={
+                "HOST_IP": os.getenv("HOST_IP", "localhost"),
+                "ISSUE_DESCRIPTION": issue_description,
+                "OPENROUTER_API_KEY": api_key,
+            },
+            capture=capture,
+        )
         try:
-            # Remove any existing container with the same name
-            try:
-                existing = client.containers.get(container_name)
-                existing.remove(force=True)
-            except docker.errors.NotFound:
-                pass
-
-            container = client.containers.create(
-                image=image_name,
-                name=container_name,
-                detach=True,
-                # ports={"3000/tcp": 3000},
-                extra_hosts={"host.docker.internal": "host-gateway"},
-                environment={
-                    "HOST_IP": os.getenv("HOST_IP", "localhost"),
-                    "ISSUE_DESCRIPTION": issue_description,
-                    "OPENROUTER_API_KEY": api_key,
-                },
-                command="sleep infinity",
-            )
-
-            # Start the container
-            container.start()
-            container.exec_run(f"git reset --hard {base_commit}", workdir="/testbed")
-            # Copy files from temp_dir into container
-            if remote_host_url:
-                # For remote Docker host, use docker context or SSH to copy files
-                os.system(
-                    f"docker -H {remote_host_url} cp {temp_dir}/code/. {container_name}:/app/code/"
-                )
-                # Clear /testbed/ directory before copying new files
-                # container.exec_run("rm -rf /testbed/*")
-                # Copy repo files to /testbed/ directory
-                # os.system(
-                    # f"docker -H {remote_host_url} cp {temp_dir}/repo/. {container_name}:/testbed/"
-                # )
-            else:
-                # For local Docker host
-                os.system(f"docker cp {temp_dir}/code/. {container_name}:/app/code/")
-                # Clear /testbed/ directory before copying new files
-                # container.exec_run("rm -rf /testbed/*")
-                # Copy repo files to /testbed/ directory
-                # os.system(f"docker cp {temp_dir}/repo/. {container_name}:/testbed/")
-
-            # Execute runner.py in container
-            exec_result, logs = exec_container_with_timeout(
-                container, "python3 -u /app/code/runner.py", 1200
-            )
-            logs = logs.decode("utf-8")
-            # print("===== CONTAINER LOGS =====")
-            # print(logs)
-            # print("===== CONTAINER LOGS =====")
-            patch_line = next(
-                line for line in reversed(logs.split("\n")) if line.startswith("Patch:")
+            result = json.loads(read_container_file(container, RUNNER_RESULT_PATH))
+        except Exception as e:
+            raise RuntimeError(
+                f"No result from the runner ({e}), logs:\n{logs[-2000:].decode(errors='ignore')}"
             )
-            try:
-                # First try parsing as JSON
-                patch_dict = json.loads(patch_line.replace("Patch:", "").strip())
-            except json.JSONDecodeError:
-                # Fall back to safely evaluating as literal Python dict
-                patch_dict = ast.literal_eval(patch_line.replace("Patch:", "").strip())
+        if result.get("patch") is None:
+            raise RuntimeError(f"The logic failed:\n{(result.get('error') or '')[-2000:]}")
+        print(
+            f"Logic for {hotkey} finished in {result.get('duration', 0):.2f} seconds "
+            f"with {result.get('llm_calls', 0)} LLM calls, {result.get('total_tokens', 0)} tokens used by its key"
+        )
+        return result["patch"]
 
-            return patch_dict
+    except docker.errors.APIError as e:
+        print(f"Docker API error: {str(e)}")
+        raise
 
-        except docker.errors.APIError as e:
-            print(f"Docker API error: {str(e)}")
-            raise
+    finally:
+        CONTAINER_POOL.release(container)
 
-        finally:
-            # Cleanup container
-            try:
-                container.stop(timeout=1)
-            except:
-                pass
 
-            try:
-                container.remove(force=True)
-            except:
-                pass
 from coding.helpers.containers import DockerServer
 
 def test_docker_container(remote_host_url: str):
@@ -374,6 +593,7 @@ def test_docker_container(remote_host_url: str):
                 # ports={"3000/tcp": 3000},
                 extra_hosts={"host.docker.internal": "host-gateway"},
                 environment={"HOST_IP": os.getenv("HOST_IP", "localhost"), "OPENROUTER_API_KEY": os.getenv("OPENROUTER_API_KEY", "")},
+                labels=container_labels("test"),
                 command="sleep infinity",
             )
             
@@ -383,7 +603,7 @@ def test_docker_container(remote_host_url: str):
 
             # Copy files from temp_dir into container using the remote Docker host
             docker_cp_cmd = (
-                f"docker -H {remote_host_url} cp {temp_dir}/. {container_name}:/app/"
+                f"docker -H {docker_server.remote_hosts[0].url} cp {temp_dir}/. {container_name}:/app/"
             )
             os.system(docker_cp_cmd)
 
@@ -417,21 +637,6 @@ def test_docker_container(remote_host_url: str):
                 pass
 
 
-def delete_all_containers(remote_host_url: str | None = None):
-    client = (
-        docker.from_env()
-        if remote_host_url is None
-        else docker.DockerClient(base_url=remote_host_url)
-    )
-    for container in client.containers.list():
-        if "registry" not in container.name:
-            try:
-                container.stop(timeout=1)
-                container.remove(force=True)
-            except Exception as e:
-                print(f"Error deleting container: {container.name} - {e}")
-
-
 def exec_run_with_timeout(container, cmd, timeout: int | None = 60):
     """
     Run a command in a container with a timeout.
@@ -442,19 +647,19 @@ def exec_run_with_timeout(container, cmd, timeout: int | None = 60):
         timeout (int): Timeout in seconds.
     """
     # Local variables to store the result of executing the command
-    exec_result = b""
+    capture = OutputCapture()
     exec_id = None
     exception = None
     timed_out = False
 
     # Wrapper function to run the command
     def run_command():
-        nonlocal exec_result, exec_id, exception
+        nonlocal exec_id, exception
         try:
             exec_id = container.client.api.exec_create(container.id, cmd)["Id"]
             exec_stream = container.client.api.exec_start(exec_id, stream=True)
             for chunk in exec_stream:
-                exec_result += chunk
+                capture.write(chunk)
         except Exception as e:
             exception = e
 
@@ -474,7 +679,7 @@ def exec_run_with_timeout(container, cmd, timeout: int | None = 60):
             container.exec_run(f"kill -TERM {exec_pid}", detach=True)
         timed_out = True
     end_time = time.time()
-    return exec_result.decode(errors="ignore"), timed_out, end_time - start_time
+    return capture.getvalue().decode(errors="ignore"), timed_out, end_time - start_time
 
 
 if __name__ == "__main__":
@@ -18,6 +18,9 @@ from coding.constants import ALLOWED_MODULES, NUM_ALLOWED_CHARACTERS, ALLOWED_IM
 def logic_similar(logic1: dict, logic2: dict) -> bool:
     return json.dumps(logic1, sort_keys=True) == json.dumps(logic2, sort_keys=True)
 
+def logic_hash(logic: dict) -> str:
+    return hashlib.sha256(json.dumps(logic, sort_keys=True).encode()).hexdigest()
+
 def validate_logic(logic: dict, use_anthropic: bool = True):
     logger = logging.getLogger()
     log_level = logger.level
@@ -213,7 +216,7 @@ class Model(BaseModel):
     
     
     def get_results_string(self):
-        model_hash = hashlib.sha256(json.dumps(self.logic, sort_keys=True).encode()).hexdigest()
+        model_hash = logic_hash(self.logic)
         string = f"""\
                 [bold]Model hash:[/bold] {model_hash}
                 [bold]Model logic keys:[/bold] {self.logic.keys()}
@@ -1,5 +1,7 @@
 import os
+import math
 import json
+import time
 import pickle
 import difflib
 import traceback
@@ -9,9 +11,11 @@ import bittensor as bt
 from typing import List
 from pydantic import BaseModel
 from .tracker import gather_all_logics
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from .results import ResultStore, TaskTimings
+from .scheduler import EvaluationScheduler, TrackerQueue
 
-from .dockerutil import run_docker_container_from_base
+from .dockerutil import run_docker_container_from_base, LOGIC_VOLUMES
+from .pool import CONTAINER_POOL
 
 from coding.finetune.keys import APIKey
 from coding.schemas import Patch
@@ -24,13 +28,14 @@ from coding.constants import (
     ALLOWED_MODULES,
     NUM_ALLOWED_CHARACTERS,
     ALLOWED_IMPORTS,
+    SCORE_THRESHOLD_MARGIN,
 )
 
-from coding.tasks.swe import SWEBenchTask
+from coding.tasks.swe import SWEBenchTask, swe_image_name, GRADING_CACHE
 from coding.datasets.swefull import SWEFullDataset
 from coding.finetune.llm.manager import LLMManager
-from coding.helpers.containers import DockerServer
-from coding.finetune.model import ModelStore, logic_similar
+from coding.helpers.containers import DockerServer, IMAGE_BUILDS, IMAGE_GC, DOCKER_CLIENTS
+from coding.finetune.model import ModelStore, logic_similar, logic_hash
 
 class FinetuneEventResults(BaseModel):
     trackers: List[TrackingInfo]
@@ -70,58 +75,184 @@ def should_evaluate(tracker: TrackingInfo, block: int) -> bool:
     return len(recent_evals) < 6
 
 
+# an unchanged logic is re-evaluated at most this often (in blocks), which spreads the 6
+# evaluations a week should_evaluate allows evenly over the week
+REEVALUATION_INTERVAL = 7 * 24 * 60 * 60 // 12 // 6
+
+
+def evaluated_recently(tracker: TrackingInfo, saved_logic: dict | None, block: int) -> bool:
+    """
+    Check if the tracker's logic is unchanged since it was last evaluated, and that was
+    less than REEVALUATION_INTERVAL blocks ago.
+
+    Args:
+        tracker (TrackingInfo): The tracker to check
+        saved_logic (dict): The logic the tracker was last evaluated with, if any
+        block (int): The current block number
+    """
+    if saved_logic is None or not tracker.score_timestamps:
+        return False
+    if not logic_similar(tracker.logic, saved_logic):
+        return False
+    return block - tracker.score_timestamps[-1] < REEVALUATION_INTERVAL
+
+
+def score_upper_bound(scores: List[float], n_total: int, confidence: float = 0.95) -> float:
+    """
+    Upper confidence bound on the final average score of a partially evaluated logic.
+
+    Uses a Hoeffding bound on the mean of the remaining tasks, assuming scores are in [0, 1].
+
+    Args:
+        scores (List[float]): The scores of the completed tasks
+        n_total (int): The total number of tasks the logic would be evaluated on
+        confidence (float): The confidence level of the bound
+
+    Returns:
+        float: The highest final average score the logic can plausibly reach
+    """
+    n = len(scores)
+    if n == 0 or n_total <= 0:
+        return 1.0
+    mean = sum(scores) / n
+    delta = max(1 - confidence, 1e-12)
+    remaining_upper = min(1.0, mean + math.sqrt(math.log(1 / delta) / (2 * n)))
+    remaining = max(n_total - n, 0)
+    return (sum(scores) + remaining * remaining_upper) / max(n_total, n)
+
+
+def iter_contexts(ds):
+    """
+    Stream context data from the dataset until it runs out.
+    """
+    while True:
+        try:
+            yield ds.get()
+        except StopIteration:
+            return
+
+
 def generate_swe_tasks(
-    ds, n: int = 1000, docker_server=None, use_remote: bool = False, use_threading: bool = True
+    ds,
+    n: int = 1000,
+    docker_server=None,
+    use_remote: bool = False,
+    use_threading: bool = True,
+    verify_gold: bool = True,
+    max_workers: int = 16,
 ) -> List[SWEBenchTask]:
+    """
+    Generate `n` SWE tasks, keeping at most `max_workers` tasks building at a time.
+
+    Instances whose (repo, version) image is being built and not built yet are put aside
+    until that build is done, so the same image is never built twice at once. At most
+    `max_workers` instances are put aside, after that no more are read until a build
+    finishes.
+    """
     tasks = []
     fail_count = 0
-    ds_lock = threading.Lock()
-    
-    def create_task():
-        nonlocal fail_count
+    contexts = iter_contexts(ds)
+    deferred = []
+
+    def create_task(context_data):
         try:
-            with ds_lock:
-                context_data = ds.get()
-            return SWEBenchTask(
+            task = SWEBenchTask(
                 llm=None,
                 context=Context(**context_data),
                 docker_server=docker_server,
                 use_remote=use_remote,
             )
+            # drop instances that can't be resolved, and time the ones that can
+            if verify_gold and not task.verify_gold_patch():
+                bt.logging.warning(
+                    f"Dropping unresolvable task {task.row['instance_id']}"
+                )
+                task.repo._cleanup()
+                return None
+            return task
         except Exception as e:
             bt.logging.error(f"Error generating task: {e}")
             print(traceback.format_exc())
-            fail_count += 1
             return None
-    
+
+    def image_key(context_data):
+        row = context_data["extras"]["row"]
+        return (row["repo"], row["version"])
+
+    # tasks build their image in the registry when they run on a remote host
+    remote = use_remote and (docker_server is None or docker_server.remote is not None)
+
+    def can_start(context_data, building: set) -> bool:
+        # tasks of an image that is already built only verify their gold patch
+        return image_key(context_data) not in building or IMAGE_BUILDS.is_built(
+            swe_image_name(context_data["extras"]["row"], remote)
+        )
+
+    def next_context(building: set):
+        # prefer instances that were waiting on a build that has since finished
+        for idx, context_data in enumerate(deferred):
+            if can_start(context_data, building):
+                return deferred.pop(idx)
+        # only hold back a bounded number of rows, so a streaming dataset is not read
+        # into memory while every candidate waits on a build, the caller waits instead
+        while len(deferred) < max_workers:
+            context_data = next(contexts, None)
+            if context_data is None:
+                return None
+            if can_start(context_data, building):
+                return context_data
+            deferred.append(context_data)
+        return None
+
     if use_threading:
-        max_workers = min(16, n)
+        max_workers = max(1, min(max_workers, n))
+        # future -> image key of the task being built
+        in_flight = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Create more tasks than needed to account for failures
-            future_tasks = [executor.submit(create_task) for _ in range(n * 2)]
-            
-            for future in concurrent.futures.as_completed(future_tasks):
-                if len(tasks) >= n:
+            while len(tasks) < n:
+                # never build more tasks than are still needed
+                while (
+                    len(in_flight) < max_workers
+                    and len(tasks) + len(in_flight) < n
+                ):
+                    context_data = next_context(set(in_flight.values()))
+                    if context_data is None:
+                        break
+                    future = executor.submit(create_task, context_data)
+                    in_flight[future] = image_key(context_data)
+                if not in_flight:
                     break
-                    
-                task = future.result()
-                if task is not None:
-                    tasks.append(task)
-                
+
+                done, _ = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    in_flight.pop(future)
+                    task = future.result()
+                    if task is not None:
+                        tasks.append(task)
+                    else:
+                        fail_count += 1
+
                 if fail_count > 100:
+                    for future in in_flight:
+                        future.cancel()
                     raise Exception("Failed to generate tasks")
     else:
         # Sequential task creation
-        attempts = 0
-        while len(tasks) < n and attempts < n * 2 and fail_count <= 100:
-            task = create_task()
-            attempts += 1
+        while len(tasks) < n:
+            context_data = next_context(set())
+            if context_data is None:
+                break
+            task = create_task(context_data)
             if task is not None:
                 tasks.append(task)
-            
+            else:
+                fail_count += 1
+
             if fail_count > 100:
                 raise Exception("Failed to generate tasks")
-    
+
     return tasks[:n]
 
 def deduplicate_timestamps(timestamps: List[int]) -> List[int]:
@@ -181,16 +312,29 @@ class FinetunePipeline:
         except Exception as e:
             bt.logging.error(f"Error injecting bittensor: {e}")
             print(traceback.format_exc())
+        # every concurrent evaluation gets its own docker client on a host
+        DOCKER_CLIENTS.size = config.neuron.finetune_concurrency
         self.docker_server = DockerServer(
             remote_host_url=os.getenv("REMOTE_DOCKER_HOST") if use_remote else None,
             remote_host_registry=(
                 f"{os.getenv('DOCKER_HOST_IP')}:5000" if use_remote else None
             ),
+            host_capacity=config.neuron.finetune_host_capacity,
         )
+        CONTAINER_POOL.size = config.neuron.finetune_warm_containers
+        self.load_image_builds(config)
         self.graded_trackers = []
         self.ungraded_trackers = []
-        self.dataset = SWEFullDataset()
+        self.dataset = SWEFullDataset(max_images=config.neuron.finetune_max_images)
         self.llm_manager = LLMManager()
+        self.result_store = ResultStore(config)
+        self.task_timings = TaskTimings(config)
+        # hotkey -> (tracker, model, api_key, number of tasks) for trackers being evaluated
+        self.in_evaluation = {}
+        # trackers whose logic matches one that is already being evaluated
+        self.duplicate_trackers = []
+        self.store_results = True
+        self.lock = threading.RLock()
         # self.load_model_store()
         if tracking_logics is None:
             self.load_logics()
@@ -215,6 +359,7 @@ class FinetunePipeline:
                 self.config.neuron.finetune_test_size,
                 docker_server=self.docker_server,
                 use_remote=self.use_remote,
+                max_workers=self.config.neuron.finetune_build_concurrency,
             )
             self.store_tasks()
         print(f"Loaded {len(self.tasks)} tasks")
@@ -222,259 +367,401 @@ class FinetunePipeline:
     def load_logics(self):
         grabbed_trackers = gather_all_logics(self)
         print(f"Grabbed {len(grabbed_trackers)} logics")
-        saved_trackers = self.load_trackers()
-        graded_trackers = []
-        ungraded_trackers = []
+        # validate new logics up front, validation is slow and shouldn't hold the lock
         for tracker in grabbed_trackers:
-            print(f"Loading logic for {tracker.hotkey}")
-            model = self.model_store.upsert(tracker.logic)
-            self.model_store.remove_hotkey(tracker.hotkey)
-            model.hotkeys.append(tracker.hotkey)
-            exists = False
-            for saved_tracker in saved_trackers:
-                saved_tracker.score_timestamps = deduplicate_timestamps(saved_tracker.score_timestamps)
-                if len(saved_tracker.score_timestamps) == 0:
-                    saved_tracker.score_timestamps.append(saved_tracker.block)
-                if tracker.hotkey == saved_tracker.hotkey:
-                    saved_tracker.uid = tracker.uid
-                    tracker.score = saved_tracker.score
-                    tracker.score_timestamps = saved_tracker.score_timestamps
-                    if (
-                        len(saved_tracker.score_timestamps) > 0
-                        and saved_tracker.score_timestamps[-1]
-                        < self.subtensor.block - 14400 * 3
-                    ):
-                        break
-                    exists = True
-                    if saved_tracker.score == 0:
-                        if saved_tracker.logic != tracker.logic:
-                            self.model_store.delete(saved_tracker.logic)
-                            model = self.model_store.upsert(tracker.logic)
-                        ungraded_trackers.append(tracker)
-                        break
-                    if (
-                        tracker.logic != {}
-                        and logic_similar(tracker.logic, saved_tracker.logic)
-                    ):
-                        model = self.model_store.get(tracker.logic)
-                        # if models are different, delete the old one and insert the new one to get the logic revalidated
-                        if not logic_similar(tracker.logic, saved_tracker.logic):
-                            self.model_store.delete(saved_tracker.logic)
-                            model = self.model_store.upsert(tracker.logic)
-                        if not model or not model.valid or saved_tracker.score == 0:
-                            tracker.score = 0
+            self.model_store.upsert(tracker.logic)
+        # the evaluation thread may be grading trackers while we reload them
+        with self.lock:
+            saved_trackers = self.load_trackers()
+            graded_trackers = []
+            ungraded_trackers = []
+            for tracker in grabbed_trackers:
+                print(f"Loading logic for {tracker.hotkey}")
+                model = self.model_store.upsert(tracker.logic)
+                self.model_store.remove_hotkey(tracker.hotkey)
+                model.hotkeys.append(tracker.hotkey)
+                exists = False
+                for saved_tracker in saved_trackers:
+                    saved_tracker.score_timestamps = deduplicate_timestamps(saved_tracker.score_timestamps)
+                    if len(saved_tracker.score_timestamps) == 0:
+                        saved_tracker.score_timestamps.append(saved_tracker.block)
+                    if tracker.hotkey == saved_tracker.hotkey:
+                        saved_tracker.uid = tracker.uid
+                        tracker.score = saved_tracker.score
+                        tracker.score_timestamps = saved_tracker.score_timestamps
+                        if (
+                            len(saved_tracker.score_timestamps) > 0
+                            and saved_tracker.score_timestamps[-1]
+                            < self.subtensor.block - 14400 * 3
+                        ):
+                            break
+                        exists = True
+                        if saved_tracker.score == 0:
+                            if saved_tracker.logic != tracker.logic:
+                                self.model_store.delete(saved_tracker.logic)
+                                model = self.model_store.upsert(tracker.logic)
                             ungraded_trackers.append(tracker)
-                        else:
-                            graded_trackers.append(saved_tracker)
-                    else:
+                            break
                         if (
-                            tracker.logic == {}
-                            and saved_tracker.logic != {}
+                            tracker.logic != {}
+                            and logic_similar(tracker.logic, saved_tracker.logic)
                         ):
-                            model = self.model_store.get(saved_tracker.logic)
-                            if not model or not model.valid:
-                                saved_tracker.score = 0
-                            graded_trackers.append(saved_tracker)
-                        else:
                             model = self.model_store.get(tracker.logic)
-                            if not model or not model.valid:
+                            # if models are different, delete the old one and insert the new one to get the logic revalidated
+                            if not logic_similar(tracker.logic, saved_tracker.logic):
+                                self.model_store.delete(saved_tracker.logic)
+                                model = self.model_store.upsert(tracker.logic)
+                            if not model or not model.valid or saved_tracker.score == 0:
                                 tracker.score = 0
-                            ungraded_trackers.append(tracker)
-                    break
-            if not exists:
-                ungraded_trackers.append(tracker)
-        print(f"Loaded {len(grabbed_trackers)} logics. Doing a final walkthrough to ensure all logics are valid...")
-        for tracker in graded_trackers:
-            model = self.model_store.get(tracker.logic)
-            if not model or not model.valid:
-                tracker.score = 0
-                print(f"Logic for {tracker.hotkey} is invalid, setting score to 0")
-            model.score = tracker.score
-        if all(tracker.logic == {} for tracker in ungraded_trackers):
-            print("All ungraded trackers have empty logic")
-        self.graded_trackers = graded_trackers
-        self.ungraded_trackers = ungraded_trackers
-        self.model_store.save()
-        print(
-            f"Loaded {len(self.graded_trackers)} graded and {len(self.ungraded_trackers)} ungraded trackers"
-        )
+                                ungraded_trackers.append(tracker)
+                            else:
+                                graded_trackers.append(saved_tracker)
+                        else:
+                            if (
+                                tracker.logic == {}
+                                and saved_tracker.logic != {}
+                            ):
+                                model = self.model_store.get(saved_tracker.logic)
+                                if not model or not model.valid:
+                                    saved_tracker.score = 0
+                                graded_trackers.append(saved_tracker)
+                            else:
+                                model = self.model_store.get(tracker.logic)
+                                if not model or not model.valid:
+                                    tracker.score = 0
+                                ungraded_trackers.append(tracker)
+                        break
+                if not exists:
+                    ungraded_trackers.append(tracker)
+            print(f"Loaded {len(grabbed_trackers)} logics. Doing a final walkthrough to ensure all logics are valid...")
+            for tracker in graded_trackers:
+                model = self.model_store.get(tracker.logic)
+                if not model or not model.valid:
+                    tracker.score = 0
+                    print(f"Logic for {tracker.hotkey} is invalid, setting score to 0")
+                model.score = tracker.score
+            if all(tracker.logic == {} for tracker in ungraded_trackers):
+                print("All ungraded trackers have empty logic")
+            self.graded_trackers = graded_trackers
+            self.ungraded_trackers = ungraded_trackers
+            self.model_store.save()
+            print(
+                f"Loaded {len(self.graded_trackers)} graded and {len(self.ungraded_trackers)} ungraded trackers"
+            )
 
     @property
     def results(self) -> FinetuneEventResults:
-        return FinetuneEventResults(trackers=self.graded_trackers)
+        with self.lock:
+            # trackers still being evaluated keep their previous score until they are graded
+            trackers = list(self.graded_trackers)
+            trackers += [tracker for tracker, _, _, _ in self.in_evaluation.values()]
+            trackers += self.duplicate_trackers
+            return FinetuneEventResults(trackers=trackers)
 
-    def evaluate(self, n_tasks: int = None, store_results: bool = True) -> FinetuneEventResults:
-        # gather all logics
-        print("Verifying and building docker containers for each logic...")
-        for tracker in self.ungraded_trackers:
-            model = self.model_store.upsert(tracker.logic)
-            if model: 
-                self.model_store.set_hotkey_scoring_status(tracker.hotkey, False, True)
-        
-        print(f"Beginning evaluation of {len(self.tasks)} tasks...")
-        for tracker_idx, tracker in enumerate(self.ungraded_trackers):
+    def reuse_previous_score(self, tracker: TrackingInfo) -> bool:
+        """
+        If a graded tracker has the same logic, copy its score over instead of re-evaluating.
+
+        Returns:
+            bool: True if the tracker was graded from a previous result
+        """
+        previous_tracker = next(
+            (
+                t
+                for t in self.graded_trackers
+                if logic_similar(tracker.logic, t.logic)
+            ),
+            None,
+        )
+        if previous_tracker is None:
+            return False
+        if (
+            len(previous_tracker.score_timestamps) > 0
+            and len(tracker.score_timestamps) == 0
+        ):
+            tracker.score_timestamps = previous_tracker.score_timestamps
+        print(
+            f"Finetune: Using previously evaluated score for hotkey: {tracker.hotkey}"
+        )
+        # if a tracker had a score before, add the block number to the score_timestamps
+        if tracker.score > 0 or len(tracker.score_timestamps) == 0:
+            tracker.score_timestamps.append(self.metagraph.block)
+        tracker.score = previous_tracker.score
+        tracker.early_stop_bound = previous_tracker.early_stop_bound
+        self.graded_trackers.append(tracker)
+        return True
+
+    def process_task(self, tracker: TrackingInfo, api_key: APIKey, task_idx: int, task: SWEBenchTask) -> float:
+        print(f"Processing task...")
+        try:
+            print(
+                f"Making request to container for hotkey {tracker.hotkey}, task index {task_idx}..."
+            )
+            start_time = time.time()
+            try:
+                with self.docker_server.lease(task.image_name, self.use_remote) as client:
+                    result = run_docker_container_from_base(
+                        image_name=task.image_name,
+                        hotkey=tracker.hotkey,
+                        issue_description=task.query,
+                        base_commit=task.row["base_commit"],
+                        logic_files=tracker.logic,
+                        client=client,
+                        api_key=api_key.key,
+                        task_id=task.row["instance_id"],
+                        timeout=self.task_timings.runner_timeout(task.row["instance_id"]),
+                    )
+            except TimeoutError:
+                # timed out runs are part of the distribution, so the timeout can grow back
+                self.task_timings.record(
+                    task.row["instance_id"], "generation", time.time() - start_time
+                )
+                raise
+            self.task_timings.record(
+                task.row["instance_id"], "generation", time.time() - start_time
+            )
+            patch = Patch(**result)
+            print(
+                f"Scoring response for hotkey {tracker.hotkey}, task index {task_idx}..."
+            )
+            # TODO in the next comp uncomment the below
+            # score = task.score(patch, self.llm_manager.get_count())
+            start_time = time.time()
+            score = task.score(patch)
+            self.task_timings.record(
+                task.row["instance_id"], "grading", time.time() - start_time
+            )
+            # self.llm_manager.reset_count()
+            print(
+                f"Score for hotkey {tracker.hotkey}, task index {task_idx}: {score}"
+            )
+            return score
+        except Exception as e:
+            bt.logging.error(
+                f"Request failed for hotkey {tracker.hotkey}, task index {task_idx}: {e}"
+            )
+            print(traceback.format_exc())
+            return 0
+
+    def task_list(self, n_tasks: int = None) -> List[tuple]:
+        """
+        The (task_idx, task) jobs to evaluate every logic on, slowest first.
+        """
+        task_list = list(enumerate(self.tasks))
+        if n_tasks is not None:
+            task_list = task_list[:n_tasks]
+        # dispatch the slowest tasks first so the worker pool drains evenly
+        return self.task_timings.sort_longest_first(task_list)
+
+    def new_scheduler(self) -> EvaluationScheduler:
+        return EvaluationScheduler(
+            max_workers=self.config.neuron.finetune_concurrency,
+            max_per_tracker=self.config.neuron.finetune_tracker_concurrency,
+        )
+
+    def is_evaluating(self, hotkey: str) -> bool:
+        with self.lock:
+            return hotkey in self.in_evaluation or any(
+                t.hotkey == hotkey for t in self.duplicate_trackers
+            )
+
+    def enqueue_tracker(
+        self,
+        tracker: TrackingInfo,
+        scheduler: EvaluationScheduler,
+        task_list: List[tuple],
+        priority: int = 0,
+    ) -> bool:
+        """
+        Grade the tracker straight away if it doesn't need evaluating, otherwise add its
+        tasks to the scheduler.
+
+        Returns:
+            bool: True if the tracker was added to the scheduler
+        """
+        with self.lock:
             model = self.model_store.upsert(tracker.logic)
             model.scoring_in_queue = False
             if model and not model.valid:
                 tracker.score = 0
                 self.graded_trackers.append(tracker)
-                continue
-            
-            model.scoring_in_progress = True
-            
-            api_key = APIKey(tracker.hotkey, self)
-            print(
-                f"Processing tracker {tracker_idx + 1}/{len(self.ungraded_trackers)}"
-            )
+                return False
+
             # Skip if no logic provided
             if not tracker.logic:
                 print(
                     f"No logic provided for tracker {tracker.hotkey}, skipping..."
                 )
                 self.graded_trackers.append(tracker)
-                continue
+                return False
             if not should_evaluate(tracker, self.metagraph.block):
                 print(
                     f"Not enough blocks have passed since the last evaluation for tracker {tracker.hotkey}, skipping..."
                 )
                 self.graded_trackers.append(tracker)
-                continue
+                return False
 
-            previous_tracker = next(
-                (
-                    t
-                    for t in self.graded_trackers
-                    if logic_similar(tracker.logic, t.logic)
-                ),
-                None,
-            )
-            if previous_tracker is not None:
-                if (
-                    len(previous_tracker.score_timestamps) > 0
-                    and len(tracker.score_timestamps) == 0
-                ):
-                    tracker.score_timestamps = previous_tracker.score_timestamps
+            if self.reuse_previous_score(tracker):
+                return False
+
+            if any(
+                logic_similar(tracker.logic, t.logic)
+                for t, _, _, _ in self.in_evaluation.values()
+            ):
                 print(
-                    f"Finetune: Using previously evaluated score for hotkey: {tracker.hotkey}"
+                    f"Logic for hotkey {tracker.hotkey} is already being evaluated, waiting for its score..."
                 )
-                # if a tracker had a score before, add the block number to the score_timestamps
-                if tracker.score > 0 or len(tracker.score_timestamps) == 0:
-                    tracker.score_timestamps.append(self.metagraph.block)
-                tracker.score = previous_tracker.score
-                self.graded_trackers.append(tracker)
-                # if tracker.hotkey != previous_tracker.hotkey:
-                # self.trackers.append(tracker)
-                continue
+                self.duplicate_trackers.append(tracker)
+                return False
 
             # Otherwise, evaluate the logic
+            model.scoring_in_progress = True
+            api_key = APIKey(tracker.hotkey, self)
             print(f"Initializing LLM key for hotkey {tracker.hotkey}...")
             self.llm_manager.init_key(tracker.hotkey)
-            print(f"Starting docker container for hotkey {tracker.hotkey}...")
-            scores = []
-            # Create a thread pool to process tasks in parallel
-            print("Starting thread pool for task processing...")
-            with ThreadPoolExecutor() as executor:
-                print("Thread pool started.")
-
-                def process_task(task_data):
-                    print(f"Processing task...")
-                    task_idx, task = task_data
-                    try:
-                        print(
-                            f"Making request to container for hotkey {tracker.hotkey}, task index {task_idx}..."
-                        )
-                        result = run_docker_container_from_base(
-                            image_name=task.image_name,
-                            container_name=f"swe-logic-{str(tracker.hotkey)}-{COMPETITION_ID}-{task_idx}".lower(),
-                            repo=task.repo,
-                            hotkey=tracker.hotkey,
-                            issue_description=task.query,
-                            base_commit=task.row["base_commit"],
-                            logic_files=tracker.logic,
-                            client=(
-                                self.docker_server._remote_client
-                                if self.use_remote
-                                else self.docker_server._local_client
-                            ),
-                            remote_host_url=(
-                                os.getenv("REMOTE_DOCKER_HOST")
-                                if self.use_remote
-                                else None
-                            ),
-                            api_key=api_key.key
-                        )
-                        patch = Patch(**result)
-                        print(
-                            f"Scoring response for hotkey {tracker.hotkey}, task index {task_idx}..."
-                        )
-                        # TODO in the next comp uncomment the below
-                        # score = task.score(patch, self.llm_manager.get_count())
-                        score = task.score(patch)
-                        # self.llm_manager.reset_count()
-                        print(
-                            f"Score for hotkey {tracker.hotkey}, task index {task_idx}: {score}"
-                        )
-                        return score
-                    except Exception as e:
-                        bt.logging.error(
-                            f"Request failed for hotkey {tracker.hotkey}, task index {task_idx}: {e}"
-                        )
-                        print(traceback.format_exc())
-                        return 0
-
-                # Keep track of active futures and tasks
-                active_futures = {}
-                task_queue = list(enumerate(self.tasks))
-                if n_tasks is not None:
-                    task_queue = task_queue[:n_tasks]
-                task_idx = 0
-
-                # Start initial batch of 8 tasks
-                print("Starting initial batch of 8 tasks...")
-                while len(active_futures) < 8 and task_queue:
-                    task_data = task_queue.pop(0)
-                    future = executor.submit(process_task, task_data)
-                    active_futures[future] = task_data
-
+            # resume from any results stored by an interrupted evaluation
+            digest = logic_hash(tracker.logic)
+            stored_scores = {}
+            pending_tasks = []
+            for task_idx, task in task_list:
+                stored_score = self.result_store.get(digest, task.row["instance_id"])
+                if stored_score is None:
+                    pending_tasks.append((task_idx, task))
+                else:
+                    stored_scores[task_idx] = stored_score
+            self.in_evaluation[tracker.hotkey] = (tracker, model, api_key, len(task_list))
+            queue = scheduler.add(tracker.hotkey, pending_tasks, priority)
+            queue.results.update(stored_scores)
+            if queue.results:
                 print(
-                    f"Task queue drained, active futures left: {len(active_futures)}"
+                    f"Resuming hotkey {tracker.hotkey} with {len(queue.results)} stored results"
                 )
-                # Process remaining tasks as others complete
-                while active_futures:
-                    completed_future = next(as_completed(active_futures))
-                    task_data = active_futures.pop(completed_future)
-
-                    # Get score from completed task
-                    score = completed_future.result()
-                    scores.append(score)
-                    print(
-                        f"Average score for hotkey {tracker.hotkey}: {sum(scores) / len(scores)}"
-                    )
+            return True
 
-                    # Start next task if any remain
-                    if task_queue:
-                        task_data = task_queue.pop(0)
-                        future = executor.submit(process_task, task_data)
-                        active_futures[future] = task_data
+    def _process(self, hotkey: str, task_idx: int, task: SWEBenchTask) -> float:
+        tracker, _, api_key, _ = self.in_evaluation[hotkey]
+        return self.process_task(tracker, api_key, task_idx, task)
 
-                    task_idx += 1
-                    print(
-                        f"Completed task {task_idx}/{len(self.tasks)} for hotkey {tracker.hotkey}"
-                    )
-            tracker.score = sum(scores) / len(scores)
+    def _on_result(self, queue: TrackerQueue, task_idx: int, score: float):
+        entry = self.in_evaluation.get(queue.key)
+        if entry is None:
+            # released by `release_evaluations` while the task was running
+            return
+        tracker, _, _, n_tasks = entry
+        self.result_store.set(
+            logic_hash(tracker.logic), queue.tasks[task_idx].row["instance_id"], score
+        )
+        scores = queue.scores
+        print(
+            f"Average score for hotkey {queue.key}: {sum(scores) / len(scores)}"
+        )
+        print(
+            f"Completed task {len(scores)}/{n_tasks} for hotkey {queue.key}"
+        )
+        if (
+            self.config.neuron.finetune_early_stop
+            and not queue.stopped
+            and len(scores) >= self.config.neuron.finetune_early_stop_min_tasks
+        ):
+            with self.lock:
+                best_score = max(
+                    (t.score for t in self.graded_trackers), default=0
+                )
+            cutoff = best_score - SCORE_THRESHOLD_MARGIN
+            bound = score_upper_bound(
+                scores,
+                n_tasks,
+                self.config.neuron.finetune_early_stop_confidence,
+            )
+            if bound < cutoff:
+                print(
+                    f"Stopping hotkey {queue.key} early, score bound {bound:.3f} is below the cutoff {cutoff:.3f}"
+                )
+                queue.stop(bound)
+
+    def _on_complete(self, queue: TrackerQueue):
+        with self.lock:
+            tracker, model, api_key, _ = self.in_evaluation.pop(queue.key)
+            scores = queue.scores
+            tracker.score = sum(scores) / len(scores) if scores else 0
+            tracker.early_stop_bound = queue.stopped_bound
             tracker.score_timestamps.append(self.metagraph.block)
             self.graded_trackers.append(tracker)
             self.model_store.set_hotkey_scoring_status(tracker.hotkey, False, False)
             model.score = tracker.score
-            if store_results:
+            # trackers with the same logic can now reuse this score
+            for duplicate in list(self.duplicate_trackers):
+                if logic_similar(duplicate.logic, tracker.logic):
+                    self.duplicate_trackers.remove(duplicate)
+                    self.reuse_previous_score(duplicate)
+            if self.store_results:
                 self.store_trackers()
                 self.model_store.save()
-            
-            api_key.delete()
+        self.result_store.remove_logic(logic_hash(tracker.logic))
+        LOGIC_VOLUMES.remove(logic_hash(tracker.logic))
+        self.task_timings.save()
 
-            print(f"Cleaning up container for hotkey {tracker.hotkey}...")
+        api_key.delete()
+        if tracker.early_stop_bound is not None:
+            print(
+                f"Final score for hotkey {tracker.hotkey}: {tracker.score} after {len(scores)} tasks, stopped early at a bound of {tracker.early_stop_bound:.3f}"
+            )
+        else:
             print(f"Final score for hotkey {tracker.hotkey}: {tracker.score}")
 
+    def release_evaluations(self):
+        """
+        Release every tracker that is still being evaluated, e.g. when evaluation is
+        stopped. Their API keys are deleted and their models are no longer marked as being
+        scored, the results stored so far are kept so a later evaluation resumes from them.
+        """
+        with self.lock:
+            released = list(self.in_evaluation.values())
+            self.in_evaluation = {}
+            self.duplicate_trackers = []
+            for tracker, _, _, _ in released:
+                self.model_store.set_hotkey_scoring_status(tracker.hotkey, False, False)
+            if released and self.store_results:
+                self.model_store.save()
+        for tracker, _, api_key, _ in released:
+            try:
+                api_key.delete()
+            except Exception as e:
+                bt.logging.error(f"Error deleting the API key of hotkey {tracker.hotkey}: {e}")
+        if released:
+            print(f"Released {len(released)} logics that were being evaluated")
+
+    def evaluate(self, n_tasks: int = None, store_results: bool = True) -> FinetuneEventResults:
+        self.store_results = store_results
+        # gather all logics
+        print("Verifying and building docker containers for each logic...")
+        for tracker in self.ungraded_trackers:
+            model = self.model_store.upsert(tracker.logic)
+            if model: 
+                self.model_store.set_hotkey_scoring_status(tracker.hotkey, False, True)
+
+        task_list = self.task_list(n_tasks)
+        scheduler = self.new_scheduler()
+
+        print(f"Beginning evaluation of {len(task_list)} tasks...")
+        for tracker_idx, tracker in enumerate(self.ungraded_trackers):
+            print(
+                f"Processing tracker {tracker_idx + 1}/{len(self.ungraded_trackers)}"
+            )
+            self.enqueue_tracker(tracker, scheduler, task_list)
+
+        print(
+            f"Scheduling {len(self.in_evaluation)} logics with a concurrency of {scheduler.max_workers}..."
+        )
+        scheduler.run(
+            self._process, on_result=self._on_result, on_complete=self._on_complete
+        )
+
+        # duplicates whose logic never got a score
+        for tracker in self.duplicate_trackers:
+            self.graded_trackers.append(tracker)
+        self.duplicate_trackers = []
+
         print("Evaluation complete!")
         self.model_store.set_all_scoring_status(False, False)
         if store_results:
@@ -546,9 +833,19 @@ class FinetunePipeline:
         # Replace the old file with the new
         os.replace(temp_file, store_file)
 
+    @staticmethod
+    def load_image_builds(config):
+        """
+        Persist the record of built images next to the tasks, so restarts skip their builds,
+        and the record of when each image was last used for garbage collection.
+        """
+        IMAGE_BUILDS.load(f"{config.neuron.full_path}/image_builds_{COMPETITION_ID}.pkl")
+        IMAGE_GC.load(f"{config.neuron.full_path}/image_usage_{COMPETITION_ID}.pkl")
+
     @staticmethod
     def generate_tasks(config) -> List[SWEBenchTask]:
-        dataset = SWEFullDataset()
+        FinetunePipeline.load_image_builds(config)
+        dataset = SWEFullDataset(max_images=config.neuron.finetune_max_images)
         tasks = generate_swe_tasks(
             dataset,
             config.neuron.finetune_test_size,
@@ -557,6 +854,7 @@ class FinetunePipeline:
                 remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000",
             ),
             use_remote=True,
+            max_workers=config.neuron.finetune_build_concurrency,
         )
         with open(f"{config.neuron.full_path}/tasks_{COMPETITION_ID}.pkl", "wb") as f:
             for task in tasks:
@@ -564,34 +862,140 @@ class FinetunePipeline:
             pickle.dump(tasks, f)
 
     @staticmethod
-    def update_tasks(config, num_tasks_to_keep: int, num_tasks_wanted: int):
+    def write_tasks(config, tasks: List[SWEBenchTask], name: str = "tasks"):
+        store_file = f"{config.neuron.full_path}/{name}_{COMPETITION_ID}.pkl"
+        temp_file = store_file + ".tmp"
+        for task in tasks:
+            task.docker_server = None
+        with open(temp_file, "wb") as f:
+            pickle.dump(tasks, f)
+        # swap the task set in one step so readers never see a partial file
+        os.replace(temp_file, store_file)
+
+    @staticmethod
+    def missing_remote_images(
+        tasks: List[SWEBenchTask], docker_server: DockerServer
+    ) -> List[str]:
+        """
+        Find the task images that are not on the remote host, pulling them from the
+        registry first.
+
+        Returns:
+            List[str]: The image names that are still missing
+        """
+        missing = []
+        for image_name in sorted({task.image_name for task in tasks}):
+            try:
+                docker_server._remote_client.images.get(image_name)
+                continue
+            except Exception:
+                pass
+            try:
+                docker_server._remote_client.images.pull(image_name)
+                docker_server._remote_client.images.get(image_name)
+            except Exception as e:
+                bt.logging.error(f"Image {image_name} is not on the remote host: {e}")
+                missing.append(image_name)
+        return missing
+
+    @staticmethod
+    def update_tasks(
+        config, num_tasks_to_keep: int, num_tasks_wanted: int
+    ) -> List[SWEBenchTask] | None:
+        """
+        Replace the first `num_tasks_to_keep` tasks with newly generated ones.
+
+        The images of the new tasks are built and pushed before anything is swapped, and
+        the new task set is only written once every image is present on the remote host,
+        so this is safe to run in the background while evaluation continues. If images are
+        missing, the new tasks that are ready are kept for the next attempt.
+
+        Returns:
+            The tasks that were rotated out, or None if the new task set was not swapped in.
+            Their repositories must be cleaned up once nothing evaluates them anymore.
+        """
+        FinetunePipeline.load_image_builds(config)
+        docker_server = DockerServer(
+            remote_host_url=os.getenv("REMOTE_DOCKER_HOST"),
+            remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000",
+        )
         if os.path.exists(f"{config.neuron.full_path}/tasks_{COMPETITION_ID}.pkl"):
             with open(
                 f"{config.neuron.full_path}/tasks_{COMPETITION_ID}.pkl", "rb"
             ) as f:
                 tasks = pickle.load(f)
-                # Clean up tasks that will be removed
-                for task in tasks[:num_tasks_to_keep]:
-                    task._cleanup()
-                tasks = tasks[num_tasks_to_keep:]  # Remove the first N tasks
         else:
             tasks = []
-        dataset = SWEFullDataset()
-        if len(tasks) < num_tasks_wanted:
-            new_tasks = generate_swe_tasks(
+        removed_tasks = tasks[:num_tasks_to_keep]  # Remove the first N tasks
+        tasks = tasks[num_tasks_to_keep:]
+        # new tasks generated by an earlier attempt that could not be swapped in
+        pending_file = f"{config.neuron.full_path}/pending_tasks_{COMPETITION_ID}.pkl"
+        new_tasks = []
+        if os.path.exists(pending_file):
+            with open(pending_file, "rb") as f:
+                new_tasks = pickle.load(f)
+            for task in new_tasks[max(num_tasks_wanted - len(tasks), 0):]:
+                task.repo._cleanup()
+            new_tasks = new_tasks[: max(num_tasks_wanted - len(tasks), 0)]
+        if len(tasks) + len(new_tasks) < num_tasks_wanted:
+            dataset = SWEFullDataset(max_images=config.neuron.finetune_max_images)
+            # the kept tasks' images count towards the cap of the next task set
+            dataset.prefer_images(
+                [(task.row["repo"], task.row["version"]) for task in tasks + new_tasks]
+            )
+            new_tasks += generate_swe_tasks(
                 dataset,
-                num_tasks_wanted - len(tasks),
-                docker_server=DockerServer(
-                    remote_host_url=os.getenv("REMOTE_DOCKER_HOST"),
-                    remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000",
-                ),
+                num_tasks_wanted - len(tasks) - len(new_tasks),
+                docker_server=docker_server,
                 use_remote=True,
+                max_workers=config.neuron.finetune_build_concurrency,
             )
-            tasks.extend(new_tasks)  # Append N new tasks
-        with open(f"{config.neuron.full_path}/tasks_{COMPETITION_ID}.pkl", "wb") as f:
-            for task in tasks:
-                task.docker_server = None
-            pickle.dump(tasks, f)
+        next_tasks = tasks + new_tasks  # Append N new tasks
+
+        missing_images = FinetunePipeline.missing_remote_images(next_tasks, docker_server)
+        if missing_images:
+            bt.logging.error(
+                f"Not swapping in the new tasks, {len(missing_images)} images are missing on the remote host"
+            )
+            # keep the new tasks that are ready, the next attempt only replaces the others
+            ready_tasks = []
+            for task in new_tasks:
+                if task.image_name in missing_images:
+                    task.repo._cleanup()
+                else:
+                    ready_tasks.append(task)
+            FinetunePipeline.write_tasks(config, ready_tasks, name="pending_tasks")
+            return None
+
+        FinetunePipeline.write_tasks(config, next_tasks)
+        if os.path.exists(pending_file):
+            os.remove(pending_file)
+
+        # the evaluation service keeps using the active task set until it reloads
+        FinetunePipeline.collect_images(
+            config,
+            docker_server,
+            {task.image_name for task in removed_tasks + next_tasks},
+        )
+        # nothing is graded against removed tasks once the service reloads
+        GRADING_CACHE.forget(task.row["instance_id"] for task in removed_tasks)
+        # images of removed tasks are kept until the garbage collection needs the space,
+        # their repositories until the trackers evaluating them are done
+        return removed_tasks
+
+    @staticmethod
+    def collect_images(config, docker_server: DockerServer, protected: set):
+        """
+        Evict the least recently used images outside the protected task sets from every
+        docker host and the registry that is over the image quota.
+        """
+        evicted = IMAGE_GC.collect(
+            docker_server,
+            protected,
+            int(config.neuron.finetune_image_quota_gb * 1024**3),
+        )
+        if evicted:
+            bt.logging.info(f"Evicted {len(evicted)} images over the image quota")
 
     @staticmethod
     def tasks_exist(config):
@@ -0,0 +1,287 @@
+import os
+import time
+import uuid
+import docker
+import threading
+from typing import Dict, Iterable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from .reaper import CONTAINER_REAPER, container_labels
+
+# resets /testbed to a commit and prints the commit's tree hash followed by the tree hash
+# of the working tree. Ignored files (e.g. compiled extensions) are kept, so this is only
+# safe on containers that have not run any code yet
+RESET_SCRIPT = (
+    "git reset --hard -q {commit} && git clean -fdq && "
+    "git rev-parse {commit}^{{tree}} && git add -A && git write-tree && git reset -q"
+)
+
+# idle containers that have not been handed out for this long are removed
+IDLE_TIMEOUT = 60 * 30
+
+
+class PooledContainer:
+    """
+    A started container and the commit its /testbed was last reset to.
+    """
+
+    def __init__(self, container, pool_key: Tuple[str, str]):
+        self.container = container
+        self.pool_key = pool_key
+        self.commit: str | None = None
+        self.last_used = time.time()
+
+
+class ContainerPool:
+    """
+    Keeps pre-started containers per image so tasks do not pay for creating, starting and
+    removing a container every time.
+
+    Containers are handed out with /testbed already at the requested commit, which is
+    verified by comparing the working tree's hash to the commit's tree. Handed out
+    containers run patches and tests, which can write anywhere in the container, so
+    released containers are never reused and are removed in the background.
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self._idle: Dict[Tuple[str, str], List[PooledContainer]] = {}
+        self._in_use: Dict[str, PooledContainer] = {}
+        self._warming: Dict[Tuple[str, str], int] = {}
+        self._clients: Dict[str, docker.DockerClient] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+
+    def _key(self, client: docker.DockerClient, image_name: str) -> Tuple[str, str]:
+        base_url = client.api.base_url
+        self._clients[base_url] = client
+        return base_url, image_name
+
+    def _create(
+        self,
+        client: docker.DockerClient,
+        pool_key: Tuple[str, str],
+        volumes: dict | None = None,
+        labels: dict | None = None,
+    ) -> PooledContainer:
+        container = client.containers.create(
+            image=pool_key[1],
+            name=f"swe-pool-{uuid.uuid4().hex[:12]}",
+            detach=True,
+            extra_hosts={"host.docker.internal": "host-gateway"},
+            environment={"HOST_IP": os.getenv("HOST_IP", "localhost")},
+            volumes=volumes,
+            labels=labels or container_labels("pool"),
+            command="sleep infinity",
+        )
+        container.start()
+        container.exec_run(
+            "git config --global --add safe.directory /testbed", workdir="/testbed"
+        )
+        return PooledContainer(container, pool_key)
+
+    def _reset(self, pooled: PooledContainer, commit: str) -> bool:
+        """
+        Reset /testbed of the container to the commit.
+
+        Returns:
+            bool: True if the working tree matches the commit afterwards
+        """
+        try:
+            exit_code, output = pooled.container.exec_run(
+                ["/bin/bash", "-c", RESET_SCRIPT.format(commit=commit)],
+                workdir="/testbed",
+            )
+        except Exception as e:
+            print(f"Error resetting container {pooled.container.name}: {e}")
+            return False
+        hashes = output.decode(errors="ignore").split()
+        if exit_code != 0 or len(hashes) != 2 or hashes[0] != hashes[1]:
+            print(f"Container {pooled.container.name} could not be reset to {commit}")
+            return False
+        pooled.commit = commit
+        return True
+
+    def _discard(self, pooled: PooledContainer):
+        try:
+            pooled.container.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Error removing container {pooled.container.name}: {e}")
+
+    def _submit(self, fn, *args) -> bool:
+        try:
+            self._executor.submit(fn, *args)
+            return True
+        except RuntimeError:
+            # the pool is being closed
+            return False
+
+    def _remove(self, pooled: PooledContainer):
+        """
+        Remove a container in the background.
+        """
+        if not self._submit(self._discard, pooled):
+            self._discard(pooled)
+
+    def _evict(self, stale) -> int:
+        """
+        Remove the idle containers `stale(pooled)` is true for.
+        """
+        with self._lock:
+            evicted = []
+            for pool_key, idle in self._idle.items():
+                evicted.extend(p for p in idle if stale(p))
+                idle[:] = [p for p in idle if not stale(p)]
+        for pooled in evicted:
+            self._remove(pooled)
+        return len(evicted)
+
+    def _evict_stale(self):
+        now = time.time()
+        self._evict(lambda pooled: now - pooled.last_used > IDLE_TIMEOUT)
+
+    def retain(self, image_names: Iterable[str]):
+        """
+        Remove the idle containers of every image that is not in `image_names`, e.g. the
+        images of tasks that were rotated out.
+        """
+        image_names = set(image_names)
+        evicted = self._evict(lambda pooled: pooled.pool_key[1] not in image_names)
+        if evicted:
+            print(f"Removed {evicted} idle containers of images that are no longer used")
+
+    def acquire(
+        self,
+        client: docker.DockerClient,
+        image_name: str,
+        commit: str,
+        volumes: dict | None = None,
+        labels: dict | None = None,
+    ):
+        """
+        Get a started container of the image with /testbed at the commit.
+
+        Args:
+            client (docker.DockerClient): Client of the docker host to run on
+            image_name (str): Image of the container
+            commit (str): Commit /testbed should be reset to
+            volumes (dict): Volumes to mount, mounts can only be set when a container is
+                created so these containers are created on demand instead of pre-started
+            labels (dict): Labels of the container if it has to be created for this call,
+                pre-started containers are labelled as pool containers
+
+        Returns:
+            docker.models.containers.Container: The container, hand it back with `release`
+        """
+        self._evict_stale()
+        pool_key = self._key(client, image_name)
+        if volumes:
+            pooled = self._create(client, pool_key, volumes, labels)
+            if not self._reset(pooled, commit):
+                self._discard(pooled)
+                raise RuntimeError(f"Could not get a container of {image_name} at {commit}")
+            with self._lock:
+                self._in_use[pooled.container.id] = pooled
+            return pooled.container
+
+        for _ in range(3):
+            with self._lock:
+                idle = self._idle.setdefault(pool_key, [])
+                pooled = next((p for p in idle if p.commit == commit), None)
+                if pooled is None and idle:
+                    pooled = idle[0]
+                if pooled is not None:
+                    idle.remove(pooled)
+            if pooled is None:
+                pooled = self._create(client, pool_key, labels=labels)
+            if pooled.commit == commit or self._reset(pooled, commit):
+                break
+            self._remove(pooled)
+        else:
+            raise RuntimeError(f"Could not get a container of {image_name} at {commit}")
+
+        with self._lock:
+            self._in_use[pooled.container.id] = pooled
+        self._submit(self._refill, pool_key, commit)
+        return pooled.container
+
+    def release(self, container):
+        """
+        Hand a container back to the pool, it is removed in the background.
+
+        Args:
+            container: A container returned by `acquire`
+        """
+        if container is None:
+            return
+        with self._lock:
+            pooled = self._in_use.pop(container.id, None)
+        if pooled is None:
+            return
+        self._remove(pooled)
+        self._evict_stale()
+
+    def owns(self, container_id: str) -> bool:
+        """
+        Whether the container is idle in the pool or handed out by it.
+        """
+        with self._lock:
+            if container_id in self._in_use:
+                return True
+            return any(
+                pooled.container.id == container_id
+                for idle in self._idle.values()
+                for pooled in idle
+            )
+
+    def _refill(self, pool_key: Tuple[str, str], commit: str):
+        """
+        Start containers until the image has `size` idle containers.
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.setdefault(pool_key, [])
+                if len(idle) + self._warming.get(pool_key, 0) >= self.size:
+                    return
+                self._warming[pool_key] = self._warming.get(pool_key, 0) + 1
+            pooled = None
+            try:
+                pooled = self._create(self._clients[pool_key[0]], pool_key)
+                if not self._reset(pooled, commit):
+                    self._discard(pooled)
+                    return
+                with self._lock:
+                    self._idle.setdefault(pool_key, []).append(pooled)
+            except Exception as e:
+                print(f"Error warming a container for {pool_key[1]}: {e}")
+                if pooled is not None:
+                    self._discard(pooled)
+                return
+            finally:
+                with self._lock:
+                    self._warming[pool_key] -= 1
+
+    def clear(self):
+        """
+        Remove every idle container.
+        """
+        with self._lock:
+            idle = [p for pooled in self._idle.values() for p in pooled]
+            self._idle = {}
+        for pooled in idle:
+            self._discard(pooled)
+
+    def close(self):
+        """
+        Wait for the background removals and warm-ups, then remove every idle container,
+        e.g. on shutdown. The pool can be used again afterwards.
+        """
+        # containers released meanwhile are removed by the releasing thread
+        self._executor.shutdown(wait=True)
+        self.clear()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+
+
+CONTAINER_POOL = ContainerPool()
+CONTAINER_REAPER.add_owner(CONTAINER_POOL.owns)
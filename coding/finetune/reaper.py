@@ -0,0 +1,200 @@
+import os
+import time
+import uuid
+import socket
+import docker
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+
+# every container the validator creates is labelled with the validator and run that created
+# it, and where known the tracker and task it was created for
+LABEL_PREFIX = "sn45-swe"
+INSTANCE_LABEL = f"{LABEL_PREFIX}.instance"
+RUN_LABEL = f"{LABEL_PREFIX}.run"
+TRACKER_LABEL = f"{LABEL_PREFIX}.tracker"
+TASK_LABEL = f"{LABEL_PREFIX}.task"
+ROLE_LABEL = f"{LABEL_PREFIX}.role"
+
+# identifies this validator across restarts, set SN45_SWE_INSTANCE when several validators
+# run on one machine and share a docker host
+INSTANCE_ID = os.getenv("SN45_SWE_INSTANCE") or socket.gethostname()
+# identifies this validator process, containers of other runs of this validator were left
+# behind by a restart
+RUN_ID = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+# containers of this run that nobody owns are reaped once they are this old
+REAP_GRACE = 60 * 10
+# containers of other validators sharing a host are only reaped once they are this old, no
+# evaluation runs nearly that long
+FOREIGN_GRACE = 60 * 60 * 24
+# how often the hosts are swept
+REAP_INTERVAL = 60
+# validators before the labels did not label their containers, unlabelled containers of
+# evaluation images created before this process started are swept once
+LEGACY_IMAGE_PREFIX = "swe-eval-"
+
+
+def container_labels(role: str, tracker: str | None = None, task: str | None = None) -> Dict[str, str]:
+    """
+    Labels for a container created by the validator.
+
+    Args:
+        role (str): What the container is for, e.g. "pool" or "logic"
+        tracker (str): Hotkey of the tracker the container was created for
+        task (str): Instance id of the task the container was created for
+    """
+    labels = {INSTANCE_LABEL: INSTANCE_ID, RUN_LABEL: RUN_ID, ROLE_LABEL: role}
+    if tracker is not None:
+        labels[TRACKER_LABEL] = str(tracker)
+    if task is not None:
+        labels[TASK_LABEL] = str(task)
+    return labels
+
+
+class ContainerReaper:
+    """
+    Removes stale validator containers from every docker host in the background.
+
+    A labelled container of this validator is stale if it was created by another run, or if
+    it was created by this run more than `grace` seconds ago and is not owned by anyone
+    anymore. Containers of other validators sharing the host are only stale once they are
+    older than `foreign_grace`. The first sweep also removes the unlabelled evaluation
+    containers left by validators that did not label them. Stale containers are removed
+    concurrently, and a container that is already gone counts as removed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        interval: float = REAP_INTERVAL,
+        grace: float = REAP_GRACE,
+        foreign_grace: float = FOREIGN_GRACE,
+    ):
+        self.max_workers = max_workers
+        self.interval = interval
+        self.grace = grace
+        self.foreign_grace = foreign_grace
+        self.started_at = time.time()
+        self._docker_server = None
+        self._owned: List[Callable[[str], bool]] = []
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def add_owner(self, owns: Callable[[str], bool]):
+        """
+        Register a check for containers of this run that are still in use, by id.
+        """
+        with self._lock:
+            self._owned.append(owns)
+
+    def _is_owned(self, container_id: str) -> bool:
+        with self._lock:
+            owners = list(self._owned)
+        return any(owns(container_id) for owns in owners)
+
+    def stale(self, client: docker.DockerClient) -> List[str]:
+        """
+        Ids of the stale validator containers on a host.
+        """
+        now = time.time()
+        stale = []
+        # sparse listing only needs one request, without inspecting every container
+        for container in client.containers.list(
+            all=True, sparse=True, filters={"label": RUN_LABEL}
+        ):
+            labels = container.attrs.get("Labels") or {}
+            age = now - container.attrs.get("Created", now)
+            if labels.get(INSTANCE_LABEL) != INSTANCE_ID:
+                if age > self.foreign_grace:
+                    stale.append(container.id)
+            elif labels.get(RUN_LABEL) != RUN_ID:
+                stale.append(container.id)
+            elif age > self.grace and not self._is_owned(container.id):
+                stale.append(container.id)
+        return stale
+
+    def legacy(self, client: docker.DockerClient) -> List[str]:
+        """
+        Ids of the unlabelled evaluation containers on a host created before this process.
+        """
+        legacy = []
+        for container in client.containers.list(all=True, sparse=True):
+            labels = container.attrs.get("Labels") or {}
+            if (
+                RUN_LABEL not in labels
+                and LEGACY_IMAGE_PREFIX in (container.attrs.get("Image") or "")
+                and container.attrs.get("Created", self.started_at) < self.started_at
+            ):
+                legacy.append(container.id)
+        return legacy
+
+    def _remove(self, client: docker.DockerClient, container_id: str) -> bool:
+        try:
+            client.api.remove_container(container_id, force=True)
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"Error reaping container {container_id[:12]}: {e}")
+            return False
+        return True
+
+    def reap(self, client: docker.DockerClient, legacy: bool = False) -> int:
+        """
+        Remove the stale validator containers on a host.
+
+        Args:
+            legacy (bool): Also remove the unlabelled evaluation containers
+
+        Returns:
+            int: Number of containers removed
+        """
+        container_ids = self.stale(client)
+        if legacy:
+            container_ids += self.legacy(client)
+        futures = [
+            self._executor.submit(self._remove, client, container_id)
+            for container_id in container_ids
+        ]
+        return sum(future.result() for future in futures)
+
+    def reap_all(self, legacy: bool = False) -> int:
+        """
+        Remove the stale validator containers on the local daemon and every healthy remote host.
+        """
+        docker_server = self._docker_server
+        clients = [docker_server._local_client] + [
+            host.client for host in docker_server.remote_hosts if host.check()
+        ]
+        removed = 0
+        for client in clients:
+            try:
+                removed += self.reap(client, legacy=legacy)
+            except Exception as e:
+                print(f"Error reaping containers on {client.api.base_url}: {e}")
+        if removed:
+            print(f"Reaped {removed} stale containers")
+        return removed
+
+    def _run(self):
+        legacy = True
+        while True:
+            self.reap_all(legacy=legacy)
+            legacy = False
+            time.sleep(self.interval)
+
+    def start(self, docker_server):
+        """
+        Start sweeping the hosts of the docker server, if the reaper is not running yet.
+        """
+        with self._lock:
+            self._docker_server = docker_server
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+
+CONTAINER_REAPER = ContainerReaper()
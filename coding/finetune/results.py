@@ -0,0 +1,174 @@
+import os
+import math
+import pickle
+import threading
+from typing import Any, Dict, List, Tuple
+
+from coding.constants import COMPETITION_ID, IMAGE_VERSION
+from .dockerutil import DEFAULT_RUNNER_TIMEOUT
+
+# recent durations kept per task and stage for percentiles
+MAX_RUNTIME_SAMPLES = 50
+# fewer samples than this and the runner timeout falls back to the default
+MIN_RUNTIME_SAMPLES = 5
+RUNNER_TIMEOUT_PERCENTILE = 95
+RUNNER_TIMEOUT_MULTIPLIER = 1.5
+MIN_RUNNER_TIMEOUT = 300
+
+
+class ResultStore:
+    """
+    Durable store of per-task scores, keyed by (logic hash, instance_id, IMAGE_VERSION).
+
+    Every write is flushed to disk so an interrupted evaluation can resume where it stopped.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.results: Dict[Tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def store_file(self) -> str:
+        return f"{self.config.neuron.full_path}/task_results_{COMPETITION_ID}.pkl"
+
+    def get(self, logic_digest: str, instance_id: str) -> float | None:
+        with self._lock:
+            return self.results.get((logic_digest, instance_id, IMAGE_VERSION))
+
+    def set(self, logic_digest: str, instance_id: str, score: float):
+        with self._lock:
+            self.results[(logic_digest, instance_id, IMAGE_VERSION)] = score
+            self._save()
+
+    def remove_logic(self, logic_digest: str):
+        """
+        Drop every stored result for a logic, e.g. once its tracker has been graded.
+        """
+        with self._lock:
+            self.results = {
+                key: score
+                for key, score in self.results.items()
+                if key[0] != logic_digest
+            }
+            self._save()
+
+    def load(self):
+        if os.path.exists(self.store_file):
+            try:
+                with open(self.store_file, "rb") as f:
+                    self.results = pickle.load(f)
+            except Exception as e:
+                print(f"Error loading task results, starting fresh: {e}")
+                self.results = {}
+
+    def _save(self):
+        temp_file = self.store_file + ".tmp"
+        with open(temp_file, "wb") as f:
+            pickle.dump(self.results, f)
+        os.replace(temp_file, self.store_file)
+
+    def __len__(self):
+        return len(self.results)
+
+
+class TaskTimings:
+    """
+    Historical generation and grading durations per SWE-bench instance.
+
+    Durations are kept as an exponential moving average so a single slow run does not
+    dominate the estimate. The most recent durations are kept as well, the runner timeout
+    of a task is derived from their distribution.
+    """
+
+    def __init__(self, config, alpha: float = 0.5):
+        self.config = config
+        self.alpha = alpha
+        # instance_id -> {"generation": seconds, "grading": seconds}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        # instance_id -> {"generation": [seconds, ...], "grading": [seconds, ...]}
+        self.samples: Dict[str, Dict[str, List[float]]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def store_file(self) -> str:
+        return f"{self.config.neuron.full_path}/task_timings_{COMPETITION_ID}.pkl"
+
+    def record(self, instance_id: str, stage: str, duration: float):
+        """
+        Record how long a stage ("generation" or "grading") of a task took.
+        """
+        with self._lock:
+            timing = self.timings.setdefault(instance_id, {})
+            if stage in timing:
+                timing[stage] = self.alpha * duration + (1 - self.alpha) * timing[stage]
+            else:
+                timing[stage] = duration
+            samples = self.samples.setdefault(instance_id, {}).setdefault(stage, [])
+            samples.append(duration)
+            del samples[:-MAX_RUNTIME_SAMPLES]
+
+    def runner_timeout(self, instance_id: str) -> int:
+        """
+        Seconds a logic may run on a task: a high percentile of the task's recorded
+        generation durations plus a margin, between MIN_RUNNER_TIMEOUT and
+        DEFAULT_RUNNER_TIMEOUT. Tasks with too few samples get the default.
+        """
+        with self._lock:
+            samples = sorted(self.samples.get(instance_id, {}).get("generation", []))
+        if len(samples) < MIN_RUNTIME_SAMPLES:
+            return DEFAULT_RUNNER_TIMEOUT
+        idx = math.ceil(RUNNER_TIMEOUT_PERCENTILE / 100 * len(samples)) - 1
+        timeout = int(samples[idx] * RUNNER_TIMEOUT_MULTIPLIER) + 60
+        return max(MIN_RUNNER_TIMEOUT, min(DEFAULT_RUNNER_TIMEOUT, timeout))
+
+    def expected(self, instance_id: str) -> float | None:
+        """
+        Expected total duration of a task, or None if it has never been timed.
+        """
+        with self._lock:
+            timing = self.timings.get(instance_id)
+            if not timing:
+                return None
+            return sum(timing.values())
+
+    def sort_longest_first(self, jobs: List[Tuple[int, Any]]) -> List[Tuple[int, Any]]:
+        """
+        Order (task_idx, task) jobs longest first (LPT) so the worker pool drains evenly.
+
+        Tasks that were never timed are assumed to take the average known duration.
+        """
+        costs = {
+            task_idx: self.expected(task.row["instance_id"]) for task_idx, task in jobs
+        }
+        known = [cost for cost in costs.values() if cost is not None]
+        default = sum(known) / len(known) if known else 0
+        return sorted(
+            jobs,
+            key=lambda job: costs[job[0]] if costs[job[0]] is not None else default,
+            reverse=True,
+        )
+
+    def load(self):
+        if os.path.exists(self.store_file):
+            try:
+                with open(self.store_file, "rb") as f:
+                    record = pickle.load(f)
+                # older records only have the moving averages
+                if "timings" in record and "samples" in record:
+                    self.timings, self.samples = record["timings"], record["samples"]
+                else:
+                    self.timings = record
+            except Exception as e:
+                print(f"Error loading task timings, starting fresh: {e}")
+                self.timings = {}
+                self.samples = {}
+
+    def save(self):
+        with self._lock:
+            temp_file = self.store_file + ".tmp"
+            with open(temp_file, "wb") as f:
+                pickle.dump({"timings": self.timings, "samples": self.samples}, f)
+            os.replace(temp_file, self.store_file)
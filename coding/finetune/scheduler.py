@@ -0,0 +1,212 @@
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class TrackerQueue:
+    """
+    Pending and in-flight tasks for a single tracker.
+
+    Tasks are dispatched strictly in the order they were added.
+    """
+
+    def __init__(self, key: str, jobs: List[Tuple[int, Any]], priority: int = 0):
+        self.key = key
+        self.priority = priority
+        self.pending = list(jobs)
+        self.tasks: Dict[int, Any] = dict(jobs)
+        self.in_flight = 0
+        self.results: Dict[int, Any] = {}
+        self.stopped_bound: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return not self.pending and self.in_flight == 0
+
+    @property
+    def scores(self) -> List[Any]:
+        return [self.results[task_idx] for task_idx in sorted(self.results)]
+
+    @property
+    def stopped(self) -> bool:
+        return self.stopped_bound is not None
+
+    def stop(self, bound: float):
+        """
+        Stop dispatching new tasks, in-flight tasks are still collected.
+
+        Args:
+            bound (float): The score bound the tracker was stopped at
+        """
+        self.pending = []
+        self.stopped_bound = bound
+
+
+class EvaluationScheduler:
+    """
+    Interleaves (tracker, task) jobs from many trackers under one concurrency budget.
+
+    Trackers with the lowest priority value are served first, trackers with the same
+    priority are served round-robin so every tracker makes progress. Each tracker can
+    optionally be capped to a number of in-flight tasks. Trackers can be added while
+    the scheduler is running.
+    """
+
+    def __init__(self, max_workers: int = 16, max_per_tracker: int | None = 8):
+        self.max_workers = max(1, max_workers)
+        self.max_per_tracker = (
+            max(1, max_per_tracker) if max_per_tracker is not None else None
+        )
+        self.queues: Dict[str, TrackerQueue] = {}
+        self._order: List[str] = []
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+
+    def add(
+        self, key: str, jobs: List[Tuple[int, Any]], priority: int = 0
+    ) -> TrackerQueue:
+        """
+        Register a tracker and the (task_idx, task) jobs it should run.
+
+        Args:
+            key (str): Unique identifier of the tracker (e.g. the hotkey)
+            jobs (list): Ordered list of (task_idx, task) tuples
+            priority (int): Trackers with a lower value are dispatched first
+        """
+        queue = TrackerQueue(key, jobs, priority)
+        with self._lock:
+            if key in self.queues:
+                raise ValueError(f"Tracker {key} is already scheduled")
+            self.queues[key] = queue
+            self._order.append(key)
+        self._wakeup.set()
+        return queue
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self.queues
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.queues)
+
+    def tasks_in_use(self) -> List[Any]:
+        """
+        The tasks of every tracker that is not done yet, including finished ones.
+        """
+        with self._lock:
+            return [
+                task for queue in self.queues.values() for task in queue.tasks.values()
+            ]
+
+    def stop(self):
+        """
+        Stop dispatching jobs and make `run` return without waiting for in-flight jobs.
+        """
+        self._stopped = True
+        self._wakeup.set()
+
+    def _next_job(self) -> Tuple[TrackerQueue, int, Any] | None:
+        """
+        Pick the next job from the highest priority trackers, starting from the tracker
+        after the last one served.
+        """
+        with self._lock:
+            chosen = None
+            for offset in range(len(self._order)):
+                idx = (self._cursor + offset) % len(self._order)
+                queue = self.queues[self._order[idx]]
+                if not queue.pending:
+                    continue
+                if (
+                    self.max_per_tracker is not None
+                    and queue.in_flight >= self.max_per_tracker
+                ):
+                    continue
+                if chosen is None or queue.priority < chosen[0].priority:
+                    chosen = (queue, idx)
+            if chosen is None:
+                return None
+            queue, idx = chosen
+            self._cursor = (idx + 1) % len(self._order)
+            task_idx, task = queue.pending.pop(0)
+            queue.in_flight += 1
+            return queue, task_idx, task
+
+    def _pop_done(self) -> List[TrackerQueue]:
+        """
+        Remove and return every tracker that has no more work.
+        """
+        with self._lock:
+            done = [self.queues[key] for key in self._order if self.queues[key].done]
+            for queue in done:
+                idx = self._order.index(queue.key)
+                self._order.pop(idx)
+                del self.queues[queue.key]
+                if idx < self._cursor:
+                    self._cursor -= 1
+            if self._order:
+                self._cursor %= len(self._order)
+            else:
+                self._cursor = 0
+            return done
+
+    def run(
+        self,
+        process: Callable[[str, int, Any], Any],
+        on_result: Callable[[TrackerQueue, int, Any], None] | None = None,
+        on_complete: Callable[[TrackerQueue], None] | None = None,
+        keep_alive: bool = False,
+    ):
+        """
+        Run registered jobs until every tracker is done.
+
+        Callbacks are invoked from the calling thread, so they do not need locking
+        against each other.
+
+        Args:
+            process: Called as process(key, task_idx, task) in a worker thread
+            on_result: Called as on_result(queue, task_idx, result) after each job
+            on_complete: Called as on_complete(queue) once a tracker has no more work
+            keep_alive (bool): Keep waiting for new trackers until `stop` is called
+        """
+        active_futures = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while not self._stopped:
+                for queue in self._pop_done():
+                    if on_complete:
+                        on_complete(queue)
+
+                while len(active_futures) < self.max_workers and not self._stopped:
+                    job = self._next_job()
+                    if job is None:
+                        break
+                    queue, task_idx, task = job
+                    future = executor.submit(process, queue.key, task_idx, task)
+                    active_futures[future] = (queue, task_idx)
+
+                if not active_futures:
+                    if len(self) > 0:
+                        continue
+                    if not keep_alive:
+                        return
+                    self._wakeup.wait(timeout=5)
+                    self._wakeup.clear()
+                    continue
+
+                completed, _ = wait(
+                    active_futures, timeout=5, return_when=FIRST_COMPLETED
+                )
+                for future in completed:
+                    queue, task_idx = active_futures.pop(future)
+                    result = future.result()
+                    with self._lock:
+                        queue.in_flight -= 1
+                        queue.results[task_idx] = result
+                    if on_result:
+                        on_result(queue, task_idx, result)
+        finally:
+            executor.shutdown(wait=not self._stopped, cancel_futures=self._stopped)
@@ -0,0 +1,148 @@
+import threading
+import traceback
+import bittensor as bt
+
+from coding.finetune.model import ModelStore
+from coding.finetune.pool import CONTAINER_POOL
+from coding.finetune.reaper import CONTAINER_REAPER
+from coding.finetune.dockerutil import LOGIC_VOLUMES
+from coding.finetune.pipeline import (
+    FinetunePipeline,
+    FinetuneEventResults,
+    evaluated_recently,
+)
+
+# trackers that have never been scored are evaluated before re-evaluations
+NEW_LOGIC_PRIORITY = 0
+REEVALUATION_PRIORITY = 1
+
+
+class EvaluationService:
+    """
+    Long-lived evaluation loop.
+
+    The pipeline, its tasks and its scheduler are kept for the life of the service. Logics
+    are queued as soon as they are discovered by `refresh` and graded results become
+    available through `results` as soon as each logic is done.
+    """
+
+    def __init__(self, config, model_store: ModelStore, use_remote: bool = True):
+        self.config = config
+        self.pipeline = FinetunePipeline(
+            config=config,
+            tracking_logics=[],
+            use_remote=use_remote,
+            model_store=model_store,
+        )
+        self.scheduler = self.pipeline.new_scheduler()
+        # rotated out tasks whose repositories are removed once no tracker uses them
+        self.retired_tasks = []
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        # containers left behind by earlier runs or failed tasks are removed in the background
+        CONTAINER_REAPER.start(self.pipeline.docker_server)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self.scheduler.run(
+                self.pipeline._process,
+                on_result=self.pipeline._on_result,
+                on_complete=self.pipeline._on_complete,
+                keep_alive=True,
+            )
+        except Exception as e:
+            bt.logging.error(f"Evaluation service stopped with an error: {e}")
+            print(traceback.format_exc())
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self.scheduler.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=60)
+        # trackers that were cut off are released like completed ones
+        self.pipeline.release_evaluations()
+        CONTAINER_POOL.close()
+        LOGIC_VOLUMES.clear()
+        for task in self.retired_tasks:
+            task.repo._cleanup()
+        self.retired_tasks = []
+
+    def refresh(self):
+        """
+        Re-gather logics from the network and queue every one that needs evaluating.
+        """
+        pipeline = self.pipeline
+        pipeline.metagraph = pipeline.subtensor.metagraph(self.config.netuid)
+        pipeline.load_logics()
+        self.cleanup_retired_tasks()
+        task_list = pipeline.task_list()
+        # the logic each tracker was last evaluated with
+        saved_logics = {
+            tracker.hotkey: tracker.logic for tracker in pipeline.load_trackers()
+        }
+        queued = 0
+        for tracker in pipeline.ungraded_trackers:
+            if pipeline.is_evaluating(tracker.hotkey):
+                continue
+            # unchanged logics that scored 0 are ungraded again as soon as they are done
+            if evaluated_recently(
+                tracker, saved_logics.get(tracker.hotkey), pipeline.metagraph.block
+            ):
+                with pipeline.lock:
+                    pipeline.graded_trackers.append(tracker)
+                continue
+            priority = (
+                NEW_LOGIC_PRIORITY
+                if len(tracker.score_timestamps) == 0
+                else REEVALUATION_PRIORITY
+            )
+            if pipeline.enqueue_tracker(tracker, self.scheduler, task_list, priority):
+                queued += 1
+        if queued:
+            with pipeline.lock:
+                pipeline.model_store.save()
+        print(
+            f"Queued {queued} logics, {len(pipeline.in_evaluation)} logics are being evaluated"
+        )
+
+    def reload_tasks(self, retired_tasks: list = ()):
+        """
+        Pick up a new task set, logics that are already queued keep their tasks.
+
+        Args:
+            retired_tasks (list): Tasks that were rotated out, their repositories are
+                removed once the trackers evaluating them are done
+        """
+        self.pipeline.load_tasks()
+        self.retired_tasks.extend(retired_tasks)
+        self.cleanup_retired_tasks()
+        # warm containers are only kept for the images that are still evaluated on
+        CONTAINER_POOL.retain(
+            task.image_name for task in self.pipeline.tasks + self.scheduler.tasks_in_use()
+        )
+
+    def cleanup_retired_tasks(self):
+        """
+        Remove the repositories of retired tasks that no queued tracker uses anymore.
+        """
+        # the scheduler's tasks were loaded separately, they share the repository path
+        paths_in_use = {task.repo.path for task in self.scheduler.tasks_in_use()}
+        still_used = []
+        for task in self.retired_tasks:
+            if task.repo.path in paths_in_use:
+                still_used.append(task)
+            else:
+                task.repo._cleanup()
+        self.retired_tasks = still_used
+
+    @property
+    def results(self) -> FinetuneEventResults:
+        return self.pipeline.results
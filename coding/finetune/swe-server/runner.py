@@ -1,15 +1,40 @@
 import os
-import submission
+import json
+import time
+import traceback
 
-swe_instance = submission.SWE()
+import swebase
+
+# the validator reads the result from this file instead of scraping the logs
+RESULT_PATH = os.getenv("RESULT_PATH", "/tmp/swe_result.json")
 
 
 def run_swe(repo_location, issue_description):
+    import submission
+
+    swe_instance = submission.SWE()
     return swe_instance(repo_location, issue_description)
 
 
+def write_result(result: dict):
+    tmp_path = f"{RESULT_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, RESULT_PATH)
+
+
 if __name__ == "__main__":
     repo_location = "/testbed"
     issue_description = os.getenv("ISSUE_DESCRIPTION")
-    result = run_swe(repo_location, issue_description)
-    print("Patch: ", result.model_dump())
+    start_time = time.time()
+    result = {"patch": None, "error": None}
+    try:
+        result["patch"] = run_swe(repo_location, issue_description).model_dump()
+    except Exception:
+        result["error"] = traceback.format_exc()
+        print(result["error"])
+    result["duration"] = time.time() - start_time
+    result.update(swebase.USAGE)
+    write_result(result)
+    if result["patch"] is not None:
+        print("Patch: ", result["patch"])
@@ -15,6 +15,10 @@ class Patch(BaseModel):
     edits: list[Edit]
 
 
+# LLM usage of this process, reported by the runner with its result
+USAGE = {"llm_calls": 0, "total_tokens": 0}
+
+
 # if host ip is localhost itll fail, need to get docker host ip
 class LLMClient:
     def __init__(
@@ -46,6 +50,9 @@ class LLMClient:
         response.raise_for_status()
 
         result = response.json()
+        USAGE["llm_calls"] += 1
+        # the server reports the total tokens used by this key so far
+        USAGE["total_tokens"] = max(USAGE["total_tokens"], result["total_tokens"])
         return result["result"], result["total_tokens"]
 
     def embed(self, query: str) -> list[float]:
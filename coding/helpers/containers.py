@@ -1,8 +1,12 @@
 import os
-import io
 import time
 import docker
+import pickle
 import logging
+import requests
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Set
 from docker.errors import BuildError, APIError
 
 # Configure logging
@@ -11,44 +15,689 @@ logging.basicConfig(
 )
 
 
+# images are exported in chunks of this size
+IMAGE_CHUNK_SIZE = 2 * 1024 * 1024
+# how long to wait for a pushed image to show up in the registry
+REGISTRY_POLL_TIMEOUT = 60
+
+# a drained host is pinged again after this many seconds
+HOST_RETRY_INTERVAL = 60
+# containers a host is expected to run at the same time, unless configured otherwise
+DEFAULT_HOST_CAPACITY = 8
+# errors that mean the host itself is unreachable, rather than a failed operation
+HOST_FAILURE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+)
+
+# HTTP connections each docker client keeps open to its host
+CLIENT_MAX_CONNECTIONS = 10
+# a client that has not been handed out for this many seconds is pinged first
+CLIENT_HEALTH_CHECK_INTERVAL = 30
+
+
+def parse_remote_hosts(remote_host_url: str | List[str] | None) -> List[str]:
+    """
+    Split a comma separated list of docker host urls, e.g. REMOTE_DOCKER_HOST.
+    """
+    if remote_host_url is None:
+        return []
+    if isinstance(remote_host_url, str):
+        remote_host_url = remote_host_url.split(",")
+    return [url.strip() for url in remote_host_url if url.strip()]
+
+
+class PooledClient:
+    """
+    A slot of a DockerClientPool, the client is connected on first use.
+    """
+
+    def __init__(self):
+        self.client: docker.DockerClient | None = None
+        self.leases = 0
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+
+class DockerClientPool:
+    """
+    Docker clients of one host shared by worker threads.
+
+    A single docker-py client only keeps `CLIENT_MAX_CONNECTIONS` HTTP connections, so
+    threads sharing it beyond that wait on each other and urllib3 warns that the
+    connection pool is full. Leases are spread over up to `size` clients, the least leased
+    first. A client that has been idle for a while is pinged before it is handed out, and
+    one that failed to reach the host is replaced by a new connection.
+    """
+
+    def __init__(self, url: str | None, size: int = 1):
+        self.url = url
+        self.size = max(1, size)
+        self._slots: List[PooledClient] = [PooledClient()]
+        self._lock = threading.Lock()
+
+    def _connect(self) -> docker.DockerClient:
+        if self.url is None:
+            return docker.from_env(max_pool_size=CLIENT_MAX_CONNECTIONS)
+        return docker.DockerClient(base_url=self.url, max_pool_size=CLIENT_MAX_CONNECTIONS)
+
+    def _ensure(self, slot: PooledClient) -> docker.DockerClient:
+        """
+        Connect the slot's client, or ping it if it has not been used for a while.
+        """
+        with slot.lock:
+            if slot.client is not None and (
+                time.time() - slot.checked_at > CLIENT_HEALTH_CHECK_INTERVAL
+            ):
+                try:
+                    slot.client.ping()
+                except Exception as e:
+                    logging.info("Reconnecting a docker client of %s: %s", self.url or "local", e)
+                    slot.client = None
+            if slot.client is None:
+                slot.client = self._connect()
+            slot.checked_at = time.time()
+            return slot.client
+
+    @property
+    def primary(self) -> docker.DockerClient:
+        """
+        The first client of the pool, for operations that do not lease a client.
+        """
+        return self._ensure(self._slots[0])
+
+    def resize(self, size: int):
+        """
+        Change the number of clients, clients that are no longer used are closed.
+        """
+        with self._lock:
+            self.size = max(1, size)
+            removed = [slot for slot in self._slots[self.size:] if slot.leases == 0]
+            self._slots = [
+                slot for i, slot in enumerate(self._slots) if i < self.size or slot.leases > 0
+            ]
+        for slot in removed:
+            if slot.client is not None:
+                slot.client.close()
+
+    @contextmanager
+    def lease(self) -> Iterator[docker.DockerClient]:
+        """
+        Lease the least used client, a client that loses its connection during the lease
+        is reconnected on its next lease.
+        """
+        with self._lock:
+            slot = min(self._slots[: self.size], key=lambda slot: slot.leases)
+            if slot.leases > 0 and len(self._slots) < self.size:
+                slot = PooledClient()
+                self._slots.append(slot)
+            slot.leases += 1
+        try:
+            yield self._ensure(slot)
+        except HOST_FAILURE_ERRORS:
+            with slot.lock:
+                slot.checked_at = 0.0
+            raise
+        finally:
+            with self._lock:
+                slot.leases -= 1
+
+
+class DockerClients:
+    """
+    Process-wide DockerClientPool of every docker host, `size` is the number of clients
+    each host gets and should match the number of concurrent evaluations.
+    """
+
+    def __init__(self, size: int = 1):
+        self._size = size
+        self._pools: Dict[str | None, DockerClientPool] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @size.setter
+    def size(self, size: int):
+        with self._lock:
+            self._size = size
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.resize(size)
+
+    def get(self, url: str | None = None) -> DockerClientPool:
+        """
+        The client pool of a docker host, None is the local daemon.
+        """
+        with self._lock:
+            if url not in self._pools:
+                self._pools[url] = DockerClientPool(url, self._size)
+            return self._pools[url]
+
+
+DOCKER_CLIENTS = DockerClients()
+
+
+class RemoteHost:
+    """
+    A remote docker host and what is known about it: the images it has, the containers
+    leased on it and whether it is reachable.
+
+    Hosts are shared by every DockerServer in the process, so the load of all tasks is
+    accounted for on the same object.
+    """
+
+    _hosts: Dict[str, "RemoteHost"] = {}
+    _hosts_lock = threading.Lock()
+
+    def __init__(self, url: str):
+        self.url = url
+        self.clients = DOCKER_CLIENTS.get(url)
+        self.images: Set[str] = set()
+        self.in_flight = 0
+        self.capacity = DEFAULT_HOST_CAPACITY
+        self.healthy = True
+        self.failed_at = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get(cls, url: str) -> "RemoteHost":
+        with cls._hosts_lock:
+            if url not in cls._hosts:
+                cls._hosts[url] = RemoteHost(url)
+            return cls._hosts[url]
+
+    @property
+    def client(self) -> docker.DockerClient:
+        return self.clients.primary
+
+    def connect(self):
+        self.client.ping()
+
+    @property
+    def load(self) -> float:
+        """
+        Containers in flight relative to the number the host is configured to run.
+        """
+        return self.in_flight / max(self.capacity, 1)
+
+    def mark_failed(self, error: Exception):
+        with self.lock:
+            if self.healthy:
+                logging.error("Draining docker host %s: %s", self.url, error)
+            self.healthy = False
+            self.failed_at = time.time()
+
+    def check(self) -> bool:
+        """
+        Ping a drained host once the retry interval has passed.
+
+        Returns:
+            bool: True if the host is healthy
+        """
+        if self.healthy:
+            return True
+        if time.time() - self.failed_at < HOST_RETRY_INTERVAL:
+            return False
+        try:
+            self.connect()
+            with self.lock:
+                self.healthy = True
+            logging.info("Docker host %s is back", self.url)
+        except Exception as e:
+            self.mark_failed(e)
+        return self.healthy
+
+    def ensure_image(self, image_name: str):
+        """
+        Make sure the host has the image, pulling it from the registry if it does not.
+        """
+        if image_name in self.images:
+            return
+        try:
+            self.client.images.get(image_name)
+        except docker.errors.ImageNotFound:
+            logging.info("Replicating image %s to %s", image_name, self.url)
+            self.client.images.pull(image_name)
+        with self.lock:
+            self.images.add(image_name)
+
+    def forget_images(self, keys: Set[str]):
+        """
+        Forget the images with these keys (see `image_key`), e.g. after they were removed.
+        """
+        with self.lock:
+            self.images = {
+                image_name for image_name in self.images if image_key(image_name) not in keys
+            }
+
+
+class ImageBuilds:
+    """
+    Process-wide single-flight coordinator for image builds.
+
+    The first caller for an image name builds it, concurrent callers wait for that build
+    and only retry themselves if it failed. Successful builds are recorded, and the record
+    is persisted once `load` has been given a path, so a restart skips both the build and
+    the check against the docker host or registry.
+    """
+
+    def __init__(self):
+        self.path: str | None = None
+        # image name -> {"built_at": timestamp}
+        self.built: Dict[str, dict] = {}
+        self._in_progress: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def load(self, path: str):
+        """
+        Persist the record at `path`, loading what is already there.
+        """
+        with self._lock:
+            if self.path == path:
+                return
+            self.path = path
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        self.built.update(pickle.load(f))
+                except Exception as e:
+                    logging.error("Failed to load the image build record: %s", e)
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.built, f)
+        os.replace(tmp_path, self.path)
+
+    def is_built(self, image_name: str) -> bool:
+        with self._lock:
+            return image_name in self.built
+
+    def build(self, image_name: str, build: Callable[[], bool]) -> bool:
+        """
+        Build the image unless it was already built, or wait for the build in progress.
+
+        Args:
+            image_name (str): Name of the image
+            build (Callable): Builds the image, returns True on success
+
+        Returns:
+            bool: True if the image is built
+        """
+        while True:
+            with self._lock:
+                if image_name in self.built:
+                    return True
+                event = self._in_progress.get(image_name)
+                if event is None:
+                    event = threading.Event()
+                    self._in_progress[image_name] = event
+                    break
+            event.wait()
+
+        try:
+            built = build()
+            if built:
+                with self._lock:
+                    self.built[image_name] = {"built_at": time.time()}
+                    self._save()
+            return built
+        finally:
+            with self._lock:
+                del self._in_progress[image_name]
+            event.set()
+
+    def forget(self, image_name: str):
+        """
+        Drop an image from the record, e.g. after it was removed.
+        """
+        with self._lock:
+            if self.built.pop(image_name, None) is not None:
+                self._save()
+
+
+IMAGE_BUILDS = ImageBuilds()
+
+
+def image_key(tag: str) -> str:
+    """
+    Name of an image without the registry prefix, e.g.
+    "1.2.3.4:5000/swe-eval-django/django-3.0:v1" -> "swe-eval-django/django-3.0:v1".
+    """
+    first, _, rest = tag.partition("/")
+    if rest and (":" in first or "." in first or first == "localhost"):
+        return rest
+    return tag
+
+
+class ImageGC:
+    """
+    Least-recently-used garbage collection of evaluation images under a disk quota.
+
+    The last use of every `swe-eval-*` image is recorded whenever it is built or leased.
+    `collect` removes the least recently used images from the local daemon, each remote
+    daemon and the registry until each of them is under the quota again. Images of the
+    active and next task sets are never removed, and neither are images a container is
+    still using.
+    """
+
+    PREFIX = "swe-eval-"
+
+    def __init__(self):
+        self.path: str | None = None
+        # image key -> timestamp of its last use
+        self.last_used: Dict[str, float] = {}
+        # image keys of the task sets at the last collection
+        self.protected: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def load(self, path: str):
+        """
+        Persist the usage record at `path`, loading what is already there.
+        """
+        with self._lock:
+            if self.path == path:
+                return
+            self.path = path
+            if os.path.exists(path):
+                try:
+                    with open(path, "rb") as f:
+                        record = pickle.load(f)
+                    for key, used in record["last_used"].items():
+                        self.last_used[key] = max(used, self.last_used.get(key, 0))
+                    self.protected |= record["protected"]
+                except Exception as e:
+                    logging.error("Failed to load the image usage record: %s", e)
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"last_used": self.last_used, "protected": self.protected}, f)
+        os.replace(tmp_path, self.path)
+
+    def touch(self, image_name: str):
+        """
+        Record that the image was just used.
+        """
+        with self._lock:
+            self.last_used[image_key(image_name)] = time.time()
+
+    def _evict_order(self, sizes: Dict[str, int], protected: Set[str]) -> List[str]:
+        """
+        Keys of the unprotected images, least recently used first.
+        """
+        with self._lock:
+            return sorted(
+                (key for key in sizes if key not in protected),
+                key=lambda key: self.last_used.get(key, 0),
+            )
+
+    def _collect_daemon(
+        self, client: docker.DockerClient, protected: Set[str], quota: int
+    ) -> List[str]:
+        # image key -> (size, tags of the image on this daemon)
+        images: Dict[str, tuple] = {}
+        for image in client.images.list():
+            for tag in image.tags:
+                key = image_key(tag)
+                if key.startswith(self.PREFIX):
+                    size, tags = images.get(key, (image.attrs.get("Size", 0), []))
+                    images[key] = (size, tags + [tag])
+        total = sum(size for size, _ in images.values())
+        evicted = []
+        for key in self._evict_order({key: size for key, (size, _) in images.items()}, protected):
+            if total <= quota:
+                break
+            size, tags = images[key]
+            try:
+                for tag in tags:
+                    # not forced, so images of running containers are kept
+                    client.images.remove(tag)
+            except docker.errors.APIError as e:
+                logging.info("Not evicting image %s: %s", key, e)
+                continue
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def _collect_registry(self, registry: str, protected: Set[str], quota: int) -> List[str]:
+        base_url = f"http://{registry}/v2"
+        headers = {"Accept": "application/vnd.docker.distribution.manifest.v2+json"}
+        response = requests.get(f"{base_url}/_catalog", params={"n": 10000}, timeout=10)
+        response.raise_for_status()
+        # image key -> (size, manifest url)
+        images: Dict[str, tuple] = {}
+        for repository in response.json().get("repositories") or []:
+            if not repository.startswith(self.PREFIX):
+                continue
+            response = requests.get(f"{base_url}/{repository}/tags/list", timeout=10)
+            response.raise_for_status()
+            for tag in response.json().get("tags") or []:
+                response = requests.get(
+                    f"{base_url}/{repository}/manifests/{tag}", headers=headers, timeout=10
+                )
+                if response.status_code != 200:
+                    continue
+                manifest = response.json()
+                # layers shared between images are counted for each, so this overestimates
+                size = manifest.get("config", {}).get("size", 0) + sum(
+                    layer.get("size", 0) for layer in manifest.get("layers", [])
+                )
+                digest = response.headers.get("Docker-Content-Digest")
+                if digest:
+                    images[f"{repository}:{tag}"] = (
+                        size,
+                        f"{base_url}/{repository}/manifests/{digest}",
+                    )
+        total = sum(size for size, _ in images.values())
+        evicted = []
+        for key in self._evict_order({key: size for key, (size, _) in images.items()}, protected):
+            if total <= quota:
+                break
+            size, manifest_url = images[key]
+            response = requests.delete(manifest_url, timeout=10)
+            if response.status_code == 405:
+                logging.error(
+                    "Registry %s does not allow deletes, set REGISTRY_STORAGE_DELETE_ENABLED=true",
+                    registry,
+                )
+                break
+            if response.status_code not in (202, 404):
+                logging.error("Failed to evict %s from the registry: %s", key, response.status_code)
+                continue
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def collect(
+        self,
+        docker_server: "DockerServer",
+        protected: Set[str],
+        quota_bytes: int,
+        registry_container: str | None = "swe-registry",
+    ) -> List[str]:
+        """
+        Evict least recently used images from every daemon and the registry that is over
+        the quota.
+
+        Registry deletes only untag the images, the space is reclaimed by running the
+        registry's garbage collection in `registry_container` on the primary remote host
+        afterwards. Only call this while no images are being pushed.
+
+        Args:
+            docker_server (DockerServer): Server with the daemons and registry to collect
+            protected (set): Images of the active and next task sets, never evicted
+            quota_bytes (int): Disk each daemon and the registry may use for images
+            registry_container (str): Name of the registry container, None to skip its
+                garbage collection
+
+        Returns:
+            List[str]: Keys of the evicted images, once for every place they were evicted
+        """
+        protected = {image_key(image_name) for image_name in protected}
+        with self._lock:
+            self.protected = protected
+        daemons = [("local", docker_server._local_client, None)] + [
+            (host.url, host.client, host)
+            for host in docker_server.remote_hosts
+            if host.check()
+        ]
+        evicted = []
+        for name, client, host in daemons:
+            try:
+                keys = self._collect_daemon(client, protected, quota_bytes)
+            except Exception as e:
+                logging.error("Image garbage collection failed on %s: %s", name, e)
+                continue
+            if keys:
+                logging.info("Evicted %d images from %s: %s", len(keys), name, keys)
+                # the host no longer has them, so leases pull them again
+                if host is not None:
+                    host.forget_images(set(keys))
+            evicted.extend(keys)
+        if docker_server.remote_host_registry is not None and docker_server.remote_hosts:
+            try:
+                keys = self._collect_registry(
+                    docker_server.remote_host_registry, protected, quota_bytes
+                )
+            except Exception as e:
+                logging.error("Image garbage collection failed on the registry: %s", e)
+                keys = []
+            if keys:
+                logging.info("Evicted %d images from the registry: %s", len(keys), keys)
+                if registry_container is not None:
+                    try:
+                        registry = docker_server._remote_client.containers.get(registry_container)
+                        registry.exec_run(
+                            "registry garbage-collect --delete-untagged /etc/docker/registry/config.yml"
+                        )
+                    except Exception as e:
+                        logging.error("Registry garbage collection failed: %s", e)
+            evicted.extend(keys)
+
+        # evicted somewhere, so the next task using it has to check or rebuild it
+        evicted_keys = set(evicted)
+        with IMAGE_BUILDS._lock:
+            built = list(IMAGE_BUILDS.built)
+        for image_name in built:
+            if image_key(image_name) in evicted_keys:
+                IMAGE_BUILDS.forget(image_name)
+        with self._lock:
+            self._save()
+        return evicted
+
+
+IMAGE_GC = ImageGC()
+
+
 class DockerServer:
     """
     Main class to manage local and remote Docker operations.
     It provides two attributes:
       - server.local: For local Docker operations.
       - server.remote: For operations that build locally and run remotely.
+
+    Several remote hosts can be given, comma separated. Builds and the registry stay on
+    the first one, containers are spread over all of them with `lease`, relative to
+    `host_capacity`, the number of containers each host is expected to run at once.
     """
 
-    def __init__(self, remote_host_url: str = None, remote_host_registry: str = None):
+    def __init__(
+        self,
+        remote_host_url: str | List[str] = None,
+        remote_host_registry: str = None,
+        host_capacity: int | None = None,
+    ):
         self.remote_host_registry = remote_host_registry
         # Initialize local Docker client
         try:
-            self._local_client = docker.from_env()
+            self._local_client = DOCKER_CLIENTS.get(None).primary
             logging.info("Connected to local Docker daemon.")
         except Exception as e:
             logging.error("Failed to initialize local Docker client: %s", e)
             raise
-        if remote_host_url is not None:
-            # Initialize remote Docker client
+        self.remote_hosts = []
+        for url in parse_remote_hosts(remote_host_url):
+            host = RemoteHost.get(url)
+            if host_capacity is not None:
+                host.capacity = host_capacity
             try:
-                self._remote_client = docker.DockerClient(base_url=remote_host_url)
-                self._remote_client.ping()
-                logging.info("Connected to remote Docker host at %s", remote_host_url)
+                host.connect()
+                logging.info("Connected to remote Docker host at %s", url)
             except Exception as e:
                 logging.error(
-                    "Failed to connect to remote Docker host at %s: %s",
-                    remote_host_url,
-                    e,
+                    "Failed to connect to remote Docker host at %s: %s", url, e
                 )
-                raise
+                # the primary host is required, other hosts are drained until they are up
+                if not self.remote_hosts:
+                    raise
+                host.mark_failed(e)
+            self.remote_hosts.append(host)
+        if self.remote_hosts:
+            self._remote_client = self.remote_hosts[0].client
 
         # Create handler objects for local and remote operations.
         self.local = LocalDockerHandler(self)
-        self.remote = RemoteDockerHandler(self) if remote_host_url is not None else None
+        self.remote = RemoteDockerHandler(self) if self.remote_hosts else None
 
-    def export_image(self, image_tag: str) -> io.BytesIO:
+    def select_host(self, image_name: str) -> RemoteHost:
         """
-        Exports the image with the given tag as an in-memory tar archive.
+        Pick the remote host to run a container of the image on.
+
+        Healthy hosts that already have the image are preferred, ties are broken by load.
+        If every host is drained the primary host is used.
+        """
+        hosts = [host for host in self.remote_hosts if host.check()]
+        if not hosts:
+            return self.remote_hosts[0]
+        return min(
+            hosts, key=lambda host: (image_name not in host.images, host.load)
+        )
+
+    @contextmanager
+    def lease(self, image_name: str, use_remote: bool = True):
+        """
+        Lease a docker client to run a container of the image on.
+
+        The image is replicated from the registry to the chosen remote host if it is
+        missing. A host that becomes unreachable during the lease is drained.
+
+        Args:
+            image_name (str): Image the container will run
+            use_remote (bool): Run on a remote host if there are any, else locally
+
+        Yields:
+            docker.DockerClient: The client of the chosen host
+        """
+        IMAGE_GC.touch(image_name)
+        if not use_remote or not self.remote_hosts:
+            with DOCKER_CLIENTS.get(None).lease() as client:
+                yield client
+            return
+        host = self.select_host(image_name)
+        with host.lock:
+            host.in_flight += 1
+        try:
+            host.ensure_image(image_name)
+            with host.clients.lease() as client:
+                yield client
+        except HOST_FAILURE_ERRORS as e:
+            host.mark_failed(e)
+            raise
+        finally:
+            with host.lock:
+                host.in_flight -= 1
+
+    def export_image(self, image_tag: str) -> Iterator[bytes]:
+        """
+        Exports the image with the given tag as a stream of tar archive chunks, without
+        holding the whole image in memory.
 
         Args:
             image_tag: The tag of the Docker image to export
@@ -56,21 +705,77 @@ class DockerServer:
         logging.info("Exporting image %s to tar archive", image_tag)
         try:
             image = self._local_client.images.get(image_tag)
-            image_tar = io.BytesIO()
             # image.save returns a generator; 'named=True' preserves tags.
-            for chunk in image.save(named=True):
-                image_tar.write(chunk)
-            image_tar.seek(0)
+            yield from image.save(chunk_size=IMAGE_CHUNK_SIZE, named=True)
             logging.info("Image export complete.")
-            return image_tar
         except Exception as e:
             logging.error("Error exporting image: %s", e)
             raise
 
+    def remote_image_matches(self, local_image_tag: str, remote_tag: str) -> bool:
+        """
+        Check whether the remote daemon has the same image (by ID) as the local daemon.
+        """
+        try:
+            local_id = self._local_client.images.get(local_image_tag).id
+            remote_id = self._remote_client.images.get(remote_tag).id
+        except docker.errors.ImageNotFound:
+            return False
+        return local_id == remote_id
+
+    def wait_for_registry(self, remote_tag: str, timeout: float = REGISTRY_POLL_TIMEOUT) -> bool:
+        """
+        Poll until the remote daemon can see the tag in the registry.
+
+        Returns:
+            bool: True if the tag became available before the timeout
+        """
+        deadline = time.time() + timeout
+        interval = 0.25
+        while True:
+            try:
+                self._remote_client.images.get_registry_data(remote_tag)
+                return True
+            except docker.errors.APIError:
+                if time.time() + interval > deadline:
+                    return False
+                time.sleep(interval)
+                interval = min(interval * 2, 5)
+
+    def registry_has_image(self, remote_tag: str) -> bool:
+        """
+        Check with a manifest lookup whether the registry has the tag. Without a registry
+        there is nothing to check.
+        """
+        if self.remote_host_registry is None:
+            return True
+        try:
+            self._remote_client.images.get_registry_data(remote_tag)
+            return True
+        except docker.errors.APIError:
+            return False
+
+    def push_image(self, client: docker.DockerClient, remote_tag: str):
+        """
+        Push the tag to the registry from the given daemon and wait until it is visible.
+        """
+        logging.info(f"Pushing image to remote registry as {remote_tag}")
+        for line in client.images.push(remote_tag, stream=True, decode=True):
+            if "error" in line:
+                raise APIError(line["error"])
+            if "status" in line:
+                logging.info(line["status"])
+        if not self.wait_for_registry(remote_tag):
+            logging.warning(f"{remote_tag} is not visible in the registry yet")
+
     def load_image_remote(self, local_image_tag: str):
         """
         Pushes a local image to the remote registry and loads it on the remote Docker daemon.
 
+        Nothing is transferred if the remote daemon already has an image with the same ID
+        and the registry has the tag; if only the registry is missing it, the remote daemon
+        pushes it so the other hosts can pull it. Without a registry the image is streamed straight into the remote daemon.
+
         Args:
             local_image_tag: The tag of the local Docker image to transfer
         """
@@ -80,20 +785,30 @@ class DockerServer:
                 self.remote_host_registry is not None
                 and self.remote_host_registry not in local_image_tag
             ):
-                # Tag image for remote registry
                 remote_tag = f"{self.remote_host_registry}/{local_image_tag}"
-                self._local_client.images.get(local_image_tag).tag(remote_tag)
             else:
                 remote_tag = local_image_tag
 
+            if self.remote_image_matches(local_image_tag, remote_tag):
+                if not self.registry_has_image(remote_tag):
+                    logging.info(f"{remote_tag} is missing from the registry")
+                    self.push_image(self._remote_client, remote_tag)
+                else:
+                    logging.info(f"Remote host already has {remote_tag}, skipping transfer")
+                return self._remote_client.images.get(remote_tag)
+
+            if self.remote_host_registry is None:
+                logging.info(f"Streaming image {local_image_tag} to remote host")
+                self._remote_client.images.load(self.export_image(local_image_tag))
+                logging.info("Successfully transferred image to remote host")
+                return self._remote_client.images.get(remote_tag)
+
+            if remote_tag != local_image_tag:
+                # Tag image for remote registry
+                self._local_client.images.get(local_image_tag).tag(remote_tag)
+
             # Push to remote registry
-            logging.info(f"Pushing image to remote registry as {remote_tag}")
-            for line in self._local_client.images.push(
-                remote_tag, stream=True, decode=True
-            ):
-                if "status" in line:
-                    logging.info(line["status"])
-            time.sleep(5)
+            self.push_image(self._local_client, remote_tag)
             # Pull on remote host
             logging.info(f"Pulling image on remote host {remote_tag}")
             self._remote_client.images.pull(remote_tag)
@@ -11,3 +11,9 @@ class TrackingInfo(BaseModel):
     score_timestamps: List[int] = Field(
         default_factory=list
     )  # timestamp is the block number
+    early_stop_bound: float | None = None  # score bound the last evaluation was stopped at
+
+    def __setstate__(self, state):
+        # trackers pickled before early stopping have no bound
+        state["__dict__"].setdefault("early_stop_bound", None)
+        super().__setstate__(state)
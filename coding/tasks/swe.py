@@ -1,6 +1,12 @@
+import io
 import os
+import json
+import shlex
+import tarfile
+import subprocess
 import time
 import docker
+import hashlib
 import shutil
 import difflib
 import tempfile
@@ -9,24 +15,20 @@ import threading
 import traceback
 import bittensor as bt
 from docker import DockerClient
-from pathlib import Path, PurePosixPath
-from typing import Callable, List, Dict
+from pathlib import Path
+from typing import Callable, Iterable, List, Dict
+from collections import OrderedDict
 
 from swebench.harness.test_spec.test_spec import make_test_spec
 from swebench.harness.constants import (
     APPLY_PATCH_FAIL,
     APPLY_PATCH_PASS,
     DOCKER_PATCH,
-    DOCKER_USER,
     DOCKER_WORKDIR,
     KEY_PREDICTION,
     LOG_TEST_OUTPUT,
     UTF8,
 )
-from swebench.harness.docker_utils import (
-    cleanup_container,
-    copy_to_container,
-)
 from swebench.harness.docker_build import (
     BuildImageError,
 )
@@ -38,8 +40,10 @@ from swebench.harness.utils import (
 from .task import Task
 from coding.helpers.git import GitRepo
 from coding.constants import IMAGE_VERSION
-from coding.helpers.containers import DockerServer
-from coding.finetune.dockerutil import exec_run_with_timeout
+from coding.helpers.containers import DockerServer, IMAGE_BUILDS, IMAGE_GC
+from coding.finetune.dockerutil import exec_run_with_timeout, read_container_file
+from coding.finetune.pool import CONTAINER_POOL
+from coding.finetune.reaper import container_labels
 from coding.schemas import Context, Patch, ChangedFile, ChangedFiles, apply_edits
 
 def normalize_image_name(image_name):
@@ -50,12 +54,200 @@ def normalize_image_name(image_name):
     return image_name
 
 
+def swe_image_name(row: dict, remote: bool) -> str:
+    """
+    Name of the evaluation image of a dataset row, in the registry if it runs remotely.
+    """
+    image_name = f"swe-eval-{row['repo']}-{row['version']}:{IMAGE_VERSION}"
+    if remote:
+        image_name = f"{os.getenv('DOCKER_HOST_IP')}:5000/{normalize_image_name(image_name)}"
+    return image_name
+
+
+# timeouts (in seconds) for running an instance's tests
+DEFAULT_TEST_TIMEOUT = 300
+GOLD_PATCH_TIMEOUT = 600
+MIN_TEST_TIMEOUT = 60
+MAX_TEST_TIMEOUT = 600
+TEST_TIMEOUT_MULTIPLIER = 3
+
+
+def adaptive_test_timeout(runtime: float) -> int:
+    """
+    Derive a test timeout from the runtime of the gold patch, so broken patches fail fast.
+    """
+    timeout = int(runtime * TEST_TIMEOUT_MULTIPLIER) + 30
+    return max(MIN_TEST_TIMEOUT, min(MAX_TEST_TIMEOUT, timeout))
+
+
 GIT_APPLY_CMDS = [
     "git apply --verbose",
     "git apply --verbose --reject",
     "patch --batch --fuzz=8 -p1 -l",
 ]
 
+GRADE_SCRIPT_PATH = "/grade.sh"
+GRADE_RESULT_MARKER = "GRADE_RESULT:"
+# the test output is written to a file, so truncating the exec output never drops test
+# status lines
+GRADE_LOG_PATH = "/tmp/test_output.log"
+MAX_TEST_LOG_BYTES = 64 * 1024 * 1024
+
+
+def make_grade_script() -> str:
+    """
+    Build the script that grades a patch in a single exec: it tries every apply command in
+    turn, runs /eval.sh into GRADE_LOG_PATH if one of them succeeds and prints a
+    structured result as its last line.
+    """
+    apply_cmds = " ".join(shlex.quote(cmd) for cmd in GIT_APPLY_CMDS)
+    return f"""#!/bin/bash
+cd {DOCKER_WORKDIR}
+apply_command=""
+for cmd in {apply_cmds}; do
+    if $cmd {DOCKER_PATCH} > /tmp/apply.log 2>&1; then
+        apply_command="$cmd"
+        break
+    fi
+done
+if [ -z "$apply_command" ]; then
+    cat /tmp/apply.log
+    echo '{GRADE_RESULT_MARKER} {{"applied": false, "apply_command": null, "eval_exit_code": null}}'
+    exit 0
+fi
+/bin/bash /eval.sh > {GRADE_LOG_PATH} 2>&1
+eval_exit_code=$?
+printf '{GRADE_RESULT_MARKER} {{"applied": true, "apply_command": "%s", "eval_exit_code": %d}}\\n' "$apply_command" "$eval_exit_code"
+"""
+
+
+GRADE_SCRIPT = make_grade_script()
+
+
+def parse_grade_output(output: str) -> tuple[str, dict | None]:
+    """
+    Split the output of the grade script into the apply output and its structured result.
+
+    Returns:
+        Tuple of (output before the result line, result or None if the script did not finish)
+    """
+    head, marker, tail = output.rpartition(GRADE_RESULT_MARKER)
+    if not marker:
+        return output, None
+    try:
+        return head, json.loads(tail.strip().splitlines()[0])
+    except (json.JSONDecodeError, IndexError):
+        return output, None
+
+
+def put_files(container, files: Dict[str, str]):
+    """
+    Write files into the container with a single put_archive call.
+
+    Args:
+        container: The container to write to
+        files (dict): Absolute path in the container -> file content
+    """
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        for path, content in files.items():
+            data = content.encode(UTF8)
+            info = tarfile.TarInfo(name=path.lstrip("/"))
+            info.size = len(data)
+            info.mode = 0o755
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(data))
+    container.put_archive("/", archive.getvalue())
+
+
+class TestsTimedOut(EvaluationError):
+    """
+    The eval script did not finish in time, processes may still be running in the container.
+    """
+
+
+def grade_in_container(
+    container,
+    test_spec,
+    pred: dict,
+    timeout: int | None,
+    logger: logging.Logger,
+):
+    """
+    Apply a prediction to /testbed of a container and run the instance's tests.
+
+    Args:
+        container: Container with /testbed at the base commit
+        test_spec (TestSpec): TestSpec of the instance
+        pred (dict): Prediction w/ model_name_or_path, model_patch, instance_id
+        timeout (int): Timeout for running tests
+        logger (logging.Logger): Logger passed to EvaluationError
+
+    Returns:
+        Tuple of (report, test runtime in seconds)
+
+    Raises:
+        EvaluationError: If the patch does not apply
+        TestsTimedOut: If the tests do not finish in time
+    """
+    instance_id = test_spec.instance_id
+    # the patch, the eval script and the grade script are copied together and run in a
+    # single exec
+    put_files(
+        container,
+        {
+            DOCKER_PATCH: pred[KEY_PREDICTION] or "",
+            "/eval.sh": test_spec.eval_script,
+            GRADE_SCRIPT_PATH: GRADE_SCRIPT,
+        },
+    )
+    output, timed_out, total_runtime = exec_run_with_timeout(
+        container, f"/bin/bash {GRADE_SCRIPT_PATH}", timeout
+    )
+    apply_output, result = parse_grade_output(output)
+    if timed_out:
+        raise TestsTimedOut(
+            instance_id,
+            f"Test timed out after {timeout} seconds.",
+            logger,
+        )
+    if result is None:
+        raise EvaluationError(
+            instance_id, f"Grading did not finish:\n{output[-2000:]}", logger
+        )
+    if not result["applied"]:
+        print(f"{APPLY_PATCH_FAIL}:\n{apply_output}")
+        raise EvaluationError(instance_id, f"{APPLY_PATCH_FAIL}:\n{apply_output}", logger)
+    print(f"Test runtime: {total_runtime:_.2f} seconds")
+    try:
+        test_output = read_container_file(
+            container, GRADE_LOG_PATH, max_bytes=MAX_TEST_LOG_BYTES
+        ).decode(errors="ignore")
+    except Exception as e:
+        raise EvaluationError(instance_id, f"Could not read the test output: {e}", logger)
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        test_output_path = Path(log_dir) / LOG_TEST_OUTPUT
+        with open(test_output_path, "w") as f:
+            f.write(test_output)
+
+        # Get report from test output
+        print(f"Grading answer for {instance_id}...")
+        report = get_eval_report(
+            test_spec=test_spec,
+            prediction=pred,
+            test_log_path=test_output_path,
+            include_tests_status=True,
+        )
+    return report, total_runtime
+
+
+def eval_logger() -> logging.Logger:
+    logger = logging.getLogger()
+    with tempfile.NamedTemporaryFile(delete=False) as temp_log_file:
+        setattr(logger, "log_file", temp_log_file.name)
+    return logger
+
 
 def run_instance(
     repo: GitRepo,
@@ -79,131 +271,30 @@ def run_instance(
         client (docker.DockerClient): Docker client
         run_id (str): Run ID
         timeout (int): Timeout for running tests
+
+    Returns:
+        Tuple of (instance_id, report, test runtime in seconds), or None on error
     """
     test_spec = make_test_spec(
         instance, namespace="swebench", instance_image_tag="latest"
     )
-    # Set up logging directory
     instance_id = test_spec.instance_id
-    logger = logging.getLogger()
-    with tempfile.NamedTemporaryFile(delete=False) as temp_log_file:
-        setattr(logger, "log_file", temp_log_file.name)
+    logger = eval_logger()
     # Run the instance
     container = None
     try:
-        print(f"Creating container for {instance_id} from image {image_name}...")
-        # Check if container with this name already exists and remove it
-        try:
-            existing_container = client.containers.get(instance_id)
-            print(f"Container {instance_id} already exists, removing it...")
-            existing_container.remove(force=True)
-        except docker.errors.NotFound:
-            pass  # Container doesn't exist, which is fine
-        # Create and start instance container from the existing image
-        container = client.containers.create(
-            image=image_name, name=instance_id, command="tail -f /dev/null"
-        )
-        container.start()
-        print(f"Container for {instance_id} created and started: {container.id}")
-        # Delete everything in /testbed/ and copy new files
-        # container.exec_run("rm -rf /testbed/*")
-        # os.system(f"docker cp {repo.temp_dir}/. {instance_id}:/testbed/")
-        container.exec_run(
-            f"git reset --hard {instance['base_commit']}", workdir="/testbed"
+        # the pool hands out a started container with /testbed at the base commit
+        container = CONTAINER_POOL.acquire(
+            client,
+            image_name,
+            instance["base_commit"],
+            labels=container_labels("grade", task=instance["instance_id"]),
         )
-        container.exec_run(
-            "git config --global --add safe.directory /testbed", workdir="/testbed"
+        print(f"Container for {instance_id} acquired: {container.name}")
+        report, total_runtime = grade_in_container(
+            container, test_spec, pred, timeout, logger
         )
-
-        
-
-        # Create a temporary directory
-        with tempfile.TemporaryDirectory() as log_dir:
-            log_dir = Path(log_dir)
-            # Copy model prediction as patch file to container
-            patch_file = log_dir / "patch.diff"
-            # pred[KEY_PREDICTION] = pred[KEY_PREDICTION]
-            patch_file.write_text(pred[KEY_PREDICTION] or "")
-            # print(
-            # f"Intermediate patch for {instance_id} written to {patch_file}, now applying to container..."
-            # )
-            copy_to_container(container, patch_file, PurePosixPath(DOCKER_PATCH))
-            # print("THE PATCH is: ", pred[KEY_PREDICTION].split("\n"))
-            # print(container.exec_run("ls", workdir="/testbed", user="root").output.decode(UTF8))
-            # Attempt to apply patch to container (TODO: FIX THIS)
-            applied_patch = False
-            for git_apply_cmd in GIT_APPLY_CMDS:
-                val = container.exec_run(
-                    f"{git_apply_cmd} {DOCKER_PATCH}",
-                    workdir=DOCKER_WORKDIR,
-                    user=DOCKER_USER,
-                )
-                if val.exit_code == 0:
-                    # print(f"{APPLY_PATCH_PASS}:\n{val.output.decode(UTF8)}")
-                    applied_patch = True
-                    break
-                # else:
-                    # print(f"Failed to apply patch to container: {git_apply_cmd}")
-                    # print("The error is: ", val.output.decode(UTF8))
-                    # print("The patch is: ", pred[KEY_PREDICTION])
-
-            if not applied_patch:
-                print(f"{APPLY_PATCH_FAIL}:\n{val.output.decode(UTF8)}")
-                raise EvaluationError(
-                    instance_id,
-                    f"{APPLY_PATCH_FAIL}:\n{val.output.decode(UTF8)}",
-                    logger,
-                )
-            # Get git diff before running eval script
-            git_diff_output_before = (
-                container.exec_run(
-                    "git -c core.fileMode=false diff", workdir=DOCKER_WORKDIR
-                )
-                .output.decode(UTF8)
-                .strip()
-            )
-
-            eval_file = Path(log_dir / "eval.sh")
-            eval_file.write_text(test_spec.eval_script)
-            # print(
-            #     f"Eval script for {instance_id} written to {eval_file}; copying to container..."
-            # )
-            copy_to_container(container, eval_file, PurePosixPath("/eval.sh"))
-            # Run eval script, write output to logs
-            test_output, timed_out, total_runtime = exec_run_with_timeout(
-                container, "/bin/bash /eval.sh", timeout
-            )
-            test_output_path = log_dir / LOG_TEST_OUTPUT
-            print(f"Test runtime: {total_runtime:_.2f} seconds")
-            with open(test_output_path, "w") as f:
-                f.write(test_output)
-                # print(f"Test output for {instance_id} written to {test_output_path}")
-                if timed_out:
-                    f.write(f"\n\nTimeout error: {timeout} seconds exceeded.")
-                    raise EvaluationError(
-                        instance_id,
-                        f"Test timed out after {timeout} seconds.",
-                        logger,
-                    )
-
-            # Get git diff after running eval script (ignore permission changes)
-            git_diff_output_after = (
-                container.exec_run(
-                    "git -c core.fileMode=false diff", workdir=DOCKER_WORKDIR
-                )
-                .output.decode(UTF8)
-                .strip()
-            )
-
-            # Get report from test output
-            print(f"Grading answer for {instance_id}...")
-            report = get_eval_report(
-                test_spec=test_spec,
-                prediction=pred,
-                test_log_path=test_output_path,
-                include_tests_status=True,
-            )
-        return instance_id, report
+        return instance_id, report, total_runtime
     except EvaluationError as e:
         error_msg = traceback.format_exc()
         print(error_msg)
@@ -219,17 +310,100 @@ def run_instance(
         )
         print(error_msg)
     finally:
-        # Remove instance container + image, close logger
-        cleanup_container(client, container, logger)
+        CONTAINER_POOL.release(container)
 
     return
 
 
+# results kept by the grading cache, the least recently used are dropped first
+GRADING_CACHE_SIZE = 50_000
+
+
+def normalize_patch(patch: str) -> str:
+    return (patch or "").replace("\r\n", "\n").strip()
+
+
+def patch_digest(patch: str) -> str:
+    return hashlib.sha256(normalize_patch(patch).encode()).hexdigest()
+
+
+class GradingCache:
+    """
+    Process-wide cache of grading results keyed by (instance_id, patch digest, IMAGE_VERSION).
+
+    Identical diffs for the same instance are only graded once, concurrent requests for
+    the same key wait for the first grader instead of starting their own container. At
+    most `max_entries` results are kept, least recently used first out, and the results
+    of rotated out tasks are dropped with `forget`.
+    """
+
+    def __init__(self, max_entries: int = GRADING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.results: OrderedDict = OrderedDict()
+        self._in_progress: Dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_or_grade(self, instance_id: str, patch: str, grade: Callable[[], int | None]) -> int:
+        """
+        Return the cached result for the patch, grading it with `grade` if it is missing.
+
+        `grade` should return None when the result is not definitive (e.g. a docker error),
+        in which case it is not cached.
+        """
+        key = (instance_id, patch_digest(patch), IMAGE_VERSION)
+        while True:
+            with self._lock:
+                if key in self.results:
+                    self.results.move_to_end(key)
+                    return self.results[key]
+                event = self._in_progress.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._in_progress[key] = event
+                    break
+            event.wait()
+
+        try:
+            result = grade()
+            if result is not None:
+                with self._lock:
+                    self.results[key] = result
+                    while len(self.results) > self.max_entries:
+                        self.results.popitem(last=False)
+            return result or 0
+        finally:
+            with self._lock:
+                del self._in_progress[key]
+            event.set()
+
+    def forget(self, instance_ids: Iterable[str]):
+        """
+        Drop the results of these instances, e.g. once their tasks were rotated out.
+        """
+        instance_ids = set(instance_ids)
+        with self._lock:
+            for key in [key for key in self.results if key[0] in instance_ids]:
+                del self.results[key]
+
+    def clear(self):
+        with self._lock:
+            self.results = OrderedDict()
+
+
+GRADING_CACHE = GradingCache()
+
+
 def score_patch(
-    patch: str, repo: GitRepo, instance: dict, client: docker.DockerClient, image_name: str
+    patch: str,
+    repo: GitRepo,
+    instance: dict,
+    client: docker.DockerClient,
+    image_name: str,
+    timeout: int = DEFAULT_TEST_TIMEOUT,
 ):
-    # if patch.strip() == "":
-        # return 0
+    # an empty patch can never resolve the issue, no need to start a container
+    if normalize_patch(patch) == "":
+        return 0
 
     prediction = {
         "instance_id": instance["instance_id"],
@@ -238,18 +412,25 @@ def score_patch(
         "model_name_or_path": "gpt-4o",
         "original_file_content": "",
     }
-    try:
-        result = run_instance(
-            repo, instance, prediction, False, False, client, "nil", 300, image_name
-        )
-        if result[1][instance["instance_id"]]["resolved"]:
-            return 1
-        else:
-            return 0
-    except Exception as e:
-        print("There was an error scoring the patch: ", e)
-        print(traceback.format_exc())
-        return 0
+
+    def grade():
+        try:
+            # every patch gets its own container, it is removed once the tests ran
+            result = run_instance(
+                repo, instance, prediction, False, False, client, "nil", timeout, image_name
+            )
+            if result is None:
+                return None
+            if result[1][instance["instance_id"]]["resolved"]:
+                return 1
+            else:
+                return 0
+        except Exception as e:
+            print("There was an error scoring the patch: ", e)
+            print(traceback.format_exc())
+            return None
+
+    return GRADING_CACHE.get_or_grade(instance["instance_id"], patch, grade)
 
 
 def add_newlines(lines: list[str]) -> list[str]:
@@ -301,6 +482,86 @@ def grab_file_from_repo(repo_path: str, file_path: str) -> str:
         return f.read()
 
 
+def is_test_file(file_path: str) -> bool:
+    return "test" in file_path
+
+
+def is_inside_repo(repo_path: str, file_path: str) -> bool:
+    if os.path.isabs(file_path):
+        return False
+    repo_root = os.path.realpath(repo_path)
+    full_path = os.path.realpath(os.path.join(repo_root, file_path))
+    return full_path.startswith(repo_root + os.sep)
+
+
+# dry-run forms of GIT_APPLY_CMDS, the patch is read from stdin
+PREFLIGHT_APPLY_CMDS = [
+    ["git", "apply", "--check"],
+    ["patch", "--batch", "--fuzz=8", "-p1", "-l", "--dry-run"],
+]
+
+
+def preflight_patch(diff: str, repo_path: str) -> tuple[bool, str]:
+    """
+    Check on the host that the patch applies to the base commit checkout, before any
+    container is created.
+
+    The patch passes if any of the apply commands the grading container tries would
+    apply it, run in dry-run mode in the checkout. Commands that are not installed on
+    the host are skipped, and if the patch fails the others it is left to the container.
+
+    Args:
+        diff (str): The diff produced by create_diff
+        repo_path (str): Path to the repository checked out at the base commit
+
+    Returns:
+        tuple[bool, str]: Whether the patch can be applied, and why not if it can't
+    """
+    if not diff.strip():
+        return False, "Patch does not change any files"
+    if shutil.which("git") is None:
+        # nothing can be checked on this host, the container decides
+        return True, ""
+    numstat = subprocess.run(
+        ["git", "apply", "--numstat"],
+        input=diff,
+        cwd=repo_path,
+        capture_output=True,
+        text=True,
+    )
+    if numstat.returncode != 0:
+        return False, f"Patch is malformed: {numstat.stderr.strip()[-500:]}"
+    # lines are "added\tdeleted\tpath"
+    file_paths = [
+        line.split("\t", 2)[2] for line in numstat.stdout.splitlines() if line.count("\t") >= 2
+    ]
+    if not file_paths:
+        return False, "Patch does not change any files"
+    for file_path in file_paths:
+        if not is_inside_repo(repo_path, file_path):
+            return False, f"Patch touches a path outside of the repository: {file_path}"
+        if is_test_file(file_path):
+            return False, f"Patch touches a test file: {file_path}"
+
+    error = ""
+    skipped = []
+    for command in PREFLIGHT_APPLY_CMDS:
+        if shutil.which(command[0]) is None:
+            skipped.append(command[0])
+            continue
+        result = subprocess.run(
+            command, input=diff, cwd=repo_path, capture_output=True, text=True
+        )
+        if result.returncode == 0:
+            return True, ""
+        error = error or (result.stderr or result.stdout).strip()[-500:]
+    if skipped:
+        # the container may still apply it with a command the host does not have
+        print(f"Pre-flight is inconclusive, {', '.join(skipped)} is not installed")
+        return True, ""
+    return False, f"Patch does not apply to the base commit: {error}"
+
+
 def patch_to_changed_files(patch: Patch, repo_path: str) -> ChangedFiles:
     changed_files = []
     file_edits = {}
@@ -350,15 +611,9 @@ class SWEBenchTask(Task):
             )
         else:
             self.docker_server = docker_server
-        self.image_name = f"swe-eval-{self.row['repo']}-{self.row['version']}:{IMAGE_VERSION}"
-        if (
-            self.use_remote
-            and hasattr(self.docker_server, "remote")
-            and self.docker_server.remote
-        ):
-            docker_host_ip = os.getenv("DOCKER_HOST_IP")
-            normalized_name = normalize_image_name(self.image_name)
-            self.image_name = f"{docker_host_ip}:5000/{normalized_name}"
+        self.image_name = swe_image_name(self.row, self._uses_remote_host)
+        self.gold_runtime = None
+        self.test_timeout = DEFAULT_TEST_TIMEOUT
         self._build_image()
 
         self.context = context
@@ -369,7 +624,72 @@ class SWEBenchTask(Task):
         self.subtopic = context.topic
         self.tags = context.tags
 
+    @property
+    def client(self) -> DockerClient:
+        return (
+            self.docker_server._local_client
+            if not self.use_remote or not self.docker_server.remote
+            else self.docker_server._remote_client
+        )
+
+    def verify_gold_patch(self) -> bool:
+        """
+        Run the gold patch once to check the instance is resolvable at all, and derive
+        this task's test timeout from how long its tests took.
+
+        Returns:
+            bool: True if the gold patch resolves the instance
+        """
+        instance_id = self.row["instance_id"]
+        prediction = {
+            "instance_id": instance_id,
+            "model_patch": self.row["patch"],
+            "raw_model_patch": self.row["patch"],
+            "model_name_or_path": "gold",
+            "original_file_content": "",
+        }
+        with self.docker_server.lease(self.image_name, self.use_remote) as client:
+            result = run_instance(
+                self.repo,
+                self.row,
+                prediction,
+                False,
+                False,
+                client,
+                "gold",
+                GOLD_PATCH_TIMEOUT,
+                self.image_name,
+            )
+        if result is None or not result[1][instance_id]["resolved"]:
+            print(f"Gold patch does not resolve {instance_id}")
+            return False
+        self.gold_runtime = result[2]
+        self.test_timeout = adaptive_test_timeout(self.gold_runtime)
+        print(
+            f"Gold patch for {instance_id} took {self.gold_runtime:.2f} seconds, test timeout set to {self.test_timeout} seconds"
+        )
+        return True
+
     def _build_image(self):
+        # tasks sharing a (repo, version) share the image, it is only built once
+        if IMAGE_BUILDS.build(self.image_name, self._build_image_once):
+            IMAGE_GC.touch(self.image_name)
+
+    @property
+    def _uses_remote_host(self) -> bool:
+        return bool(
+            self.use_remote
+            and hasattr(self.docker_server, "remote")
+            and self.docker_server.remote
+        )
+
+    def _build_image_once(self) -> bool:
+        """
+        Build the image of the task, and push it to the remote host if it is used.
+
+        Returns:
+            bool: True if the image exists afterwards
+        """
         test_spec = make_test_spec(
             self.row, namespace="swebench", instance_image_tag="latest"
         )
@@ -383,10 +703,25 @@ class SWEBenchTask(Task):
 
         try:
             client.images.get(self.image_name)
-            print(f"Image {self.image_name} already exists, skipping build")
-            return
+            exists = True
         except:
-            print(f"Building image {self.image_name}")
+            exists = False
+        if (
+            exists
+            and self._uses_remote_host
+            and not self.docker_server.registry_has_image(self.image_name)
+        ):
+            # the other hosts pull the image from the registry, so it has to be there too
+            print(f"Image {self.image_name} is missing from the registry, pushing it")
+            try:
+                self.docker_server.push_image(client, self.image_name)
+            except Exception as e:
+                print(f"Failed to push {self.image_name}: {e}")
+                exists = False
+        if exists:
+            print(f"Image {self.image_name} already exists, skipping build")
+            return True
+        print(f"Building image {self.image_name}")
         with tempfile.TemporaryDirectory() as temp_dir:
             repo_script = test_spec.install_repo_script.replace("reset --hard", "checkout -f")
             with open(os.path.join(temp_dir, "setup_repo.sh"), "w") as f:
@@ -404,27 +739,24 @@ WORKDIR /testbed/
             with open(os.path.join(temp_dir, "Dockerfile"), "w") as f:
                 f.write(dockerfile_content)
             start_time = time.time()
+            built = False
             for _ in range(3): # try 3 times
                 try:
-                    if (
-                        self.use_remote
-                        and hasattr(self.docker_server, "remote")
-                        and self.docker_server.remote
-                    ):
+                    if self._uses_remote_host:
                         self.docker_server.remote.build(
                             path=temp_dir, tag=self.image_name, push=False
                         )
                     else:
                         self.docker_server.local.build(path=temp_dir, tag=self.image_name)
+                    built = True
                     break
                 except Exception as e:
                     print("There was an error building the image: ", e)
                     print(traceback.format_exc())
-            if self.use_remote and hasattr(self.docker_server, "remote") and self.docker_server.remote:
-                self.docker_server._remote_client.images.pull(self.image_name)
             end_time = time.time()
             build_duration = end_time - start_time
             print(f"Building the Docker image took {build_duration:.2f} seconds.")
+            return built
 
     def __getstate__(self):
         # Remove the Docker image before pickling
@@ -435,6 +767,9 @@ WORKDIR /testbed/
 
     def __setstate__(self, state):
         self.__dict__.update(state)
+        # tasks pickled before the gold patch pass use the flat timeout
+        self.__dict__.setdefault("gold_runtime", None)
+        self.__dict__.setdefault("test_timeout", DEFAULT_TEST_TIMEOUT)
         # Rebuild the Docker image after unpickling
         self.docker_server = DockerServer(
             remote_host_url=os.getenv("REMOTE_DOCKER_HOST", None),
@@ -464,17 +799,33 @@ WORKDIR /testbed/
 
     def score(self, patch: Patch):
         try:
+            # pre-flight on the host so malformed patches never reach a container
+            for edit in patch.edits:
+                if not is_inside_repo(self.repo.path, edit.file_name):
+                    print(f"Pre-flight failed, edit outside of the repository: {edit.file_name}")
+                    return 0
             changed_files = patch_to_changed_files(patch, self.repo.path)
             changed_files.files = [
-                file for file in changed_files.files if "test" not in file.file_name
+                file for file in changed_files.files if not is_test_file(file.file_name)
             ]
+            if not changed_files.files:
+                print("Pre-flight failed, patch does not change any non-test files")
+                return 0
             diff = create_diff(changed_files.files)
-            client = (
-                self.docker_server._local_client
-                if not self.use_remote or not self.docker_server.remote
-                else self.docker_server._remote_client
-            )
-            return score_patch(diff, self.repo, self.row, client, self.image_name)
+            can_apply, reason = preflight_patch(diff, self.repo.path)
+            if not can_apply:
+                print(f"Pre-flight failed, {reason}")
+                return 0
+            # grading runs on whichever host has the image and the least load
+            with self.docker_server.lease(self.image_name, self.use_remote) as client:
+                return score_patch(
+                    diff,
+                    self.repo,
+                    self.row,
+                    client,
+                    self.image_name,
+                    timeout=self.test_timeout,
+                )
         except Exception as e:
             print("There was an error scoring the patch: ", e)
             print(traceback.format_exc())
@@ -482,6 +833,7 @@ WORKDIR /testbed/
 
     def _cleanup(self):
         self.repo._cleanup()
+        IMAGE_BUILDS.forget(self.image_name)
         try:
             if self.use_remote:
                 self.docker_server._local_client.images.remove(self.image_name, force=True)
@@ -301,6 +301,76 @@ def add_validator_args(cls, parser):
         default=100,
     )
 
+    parser.add_argument(
+        "--neuron.finetune_concurrency",
+        type=int,
+        help="The number of finetune tasks evaluated at the same time, across all logics, and the number of docker clients kept per host.",
+        default=16,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_host_capacity",
+        type=int,
+        help="The number of finetune containers each remote docker host is expected to run at the same time, containers are spread over the hosts relative to it.",
+        default=8,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_tracker_concurrency",
+        type=int,
+        help="The max number of finetune tasks evaluated at the same time for a single logic.",
+        default=8,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_build_concurrency",
+        type=int,
+        help="The number of finetune tasks (and their images) built at the same time.",
+        default=16,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_warm_containers",
+        type=int,
+        help="Number of pre-started containers kept per finetune task image.",
+        default=2,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_max_images",
+        type=int,
+        help="If set, finetune tasks are sampled from at most this many distinct (repo, version) images.",
+        default=None,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_image_quota_gb",
+        type=float,
+        help="Disk in GB each docker host and the registry may use for evaluation images, least recently used images outside the task sets are removed above it.",
+        default=200,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_early_stop",
+        action="store_true",
+        help="If set, stop evaluating logics that can no longer get within the score threshold of the best score.",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_early_stop_min_tasks",
+        type=int,
+        help="The number of finetune tasks a logic must complete before it can be stopped early.",
+        default=30,
+    )
+
+    parser.add_argument(
+        "--neuron.finetune_early_stop_confidence",
+        type=float,
+        help="The confidence level of the bound used to stop logics early.",
+        default=0.95,
+    )
+
 
 def config(cls):
     """
@@ -7,8 +7,12 @@ from coding.constants import COMPETITION_ID
 from coding.protocol import StreamCodeSynapse
 from coding.helpers.results import forward_results
 from coding.finetune.pipeline import FinetunePipeline
+from coding.finetune.service import EvaluationService
 from coding.utils.logging import log_event, clean_wandb
-from coding.finetune.dockerutil import delete_all_containers
+
+# a failed task update is retried after this many blocks (~1 hour)
+TASK_UPDATE_RETRY_BLOCKS = 300
+
 
 async def forward(self, synapse: StreamCodeSynapse):
     """
@@ -28,31 +32,61 @@ async def forward(self, synapse: StreamCodeSynapse):
     if not FinetunePipeline.tasks_exist(self.config):
         FinetunePipeline.generate_tasks(self.config)
     
-    if self.last_task_update + 10800 < self.block: # every 1.5 days replace 50(half) the tasks
-        FinetunePipeline.update_tasks(self.config, 50, 100)
-        self.last_task_update = self.block
-    
-    if not hasattr(self, 'finetune_eval_future'):
-        if self.last_model_clear + 14400 * 3 < self.block:
-            self.model_store.clear_all()
-            # delete trackers
-            if os.path.exists(f"{self.config.neuron.full_path}/trackers_{COMPETITION_ID}.pkl"):
-                os.remove(f"{self.config.neuron.full_path}/trackers_{COMPETITION_ID}.pkl")
-            self.last_model_clear = self.block
-        delete_all_containers(os.getenv("REMOTE_DOCKER_HOST", None))
-        sleep(10) # wait for containers to be truly deleted
-        print("Creating finetune pipeline")
-        finetune_pipeline = FinetunePipeline(
+    if (
+        self.last_task_update + 10800 < self.block # every 1.5 days replace 50(half) the tasks
+        and getattr(self, "task_update_retry_block", 0) <= self.block
+        and not hasattr(self, "task_update_future")
+    ):
+        # build the next task set in the background, evaluation keeps using the current one
+        self.task_update_future = self.executor.submit(
+            FinetunePipeline.update_tasks, self.config, 50, 100
+        )
+    if hasattr(self, "task_update_future") and self.task_update_future.done():
+        try:
+            retired_tasks = self.task_update_future.result()
+        except Exception as e:
+            bt.logging.error(f"Error updating finetune tasks: {e}")
+            retired_tasks = None
+        delattr(self, "task_update_future")
+        if retired_tasks is not None:
+            self.last_task_update = self.block
+            if hasattr(self, "finetune_service"):
+                # removed once the trackers still evaluating them are done
+                self.finetune_service.reload_tasks(retired_tasks)
+            else:
+                for task in retired_tasks:
+                    task.repo._cleanup()
+        else:
+            self.task_update_retry_block = self.block + TASK_UPDATE_RETRY_BLOCKS
+
+    if self.last_model_clear + 14400 * 3 < self.block:
+        if hasattr(self, "finetune_service"):
+            self.finetune_service.stop()
+            delattr(self, "finetune_service")
+        self.model_store.clear_all()
+        # delete trackers
+        if os.path.exists(f"{self.config.neuron.full_path}/trackers_{COMPETITION_ID}.pkl"):
+            os.remove(f"{self.config.neuron.full_path}/trackers_{COMPETITION_ID}.pkl")
+        self.last_model_clear = self.block
+
+    if not hasattr(self, "finetune_service") or not self.finetune_service.running:
+        if hasattr(self, "finetune_service"):
+            # the service died, release what it still held before replacing it
+            self.finetune_service.stop()
+        print("Creating finetune evaluation service")
+        self.finetune_service = EvaluationService(
             config=self.config,
-            use_remote=True,
             model_store=self.model_store,
+            use_remote=True,
         )
-        print("Finetune pipeline created, submitting evaluation")
-        self.finetune_eval_future = self.executor.submit(finetune_pipeline.evaluate)
-    # Check if evaluation is complete
-    if hasattr(self, "finetune_eval_future") and self.finetune_eval_future.done():
-        self.finetune_results[COMPETITION_ID] = self.finetune_eval_future.result()
-        delattr(self, "finetune_eval_future")  # Remove the future after getting results
+        self.finetune_service.start()
+
+    # queue any new or changed logics, graded results stream in as they finish
+    try:
+        self.finetune_service.refresh()
+    except Exception as e:
+        bt.logging.error(f"Error refreshing finetune logics: {e}")
+    self.finetune_results[COMPETITION_ID] = self.finetune_service.results
 
     self.update_scores()
 
@@ -87,7 +87,13 @@ class Validator(BaseValidatorNeuron):
             remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000"
         )
         try:
-            self.docker_server.remote.run("registry:2", ports={"5000/tcp": 5000}, name="swe-registry")
+            # deletes are enabled so the image garbage collection can evict from the registry
+            self.docker_server.remote.run(
+                "registry:2",
+                ports={"5000/tcp": 5000},
+                name="swe-registry",
+                environment={"REGISTRY_STORAGE_DELETE_ENABLED": "true"},
+            )
         except Exception as e:
             bt.logging.error(f"Error running registry: {e}")
             print(traceback.format_exc())
@@ -2,95 +2,33 @@ from dotenv import load_dotenv
 
 load_dotenv('../.env')
 import os
-from coding.helpers.containers import DockerServer
+import sys
+import argparse
+import requests
+from coding.constants import COMPETITION_ID
+from coding.helpers.containers import DockerServer, IMAGE_BUILDS, IMAGE_GC
 
+# Evicts least recently used evaluation images from the local daemon, the remote hosts and
+# the registry until each is under the quota. Images of the validator's task sets at its
+# last collection are kept, and evicted images are dropped from its build record so they are
+# built again when needed. Run it while the validator is stopped, a running validator keeps
+# its own copy of the records.
+#
+# --wipe-all removes every image and container except the swe-server and registry ones,
+# restarts the registry and empties it.
+parser = argparse.ArgumentParser()
+parser.add_argument("--full-path", help="The validator's neuron.full_path", required=True)
+parser.add_argument("--quota-gb", type=float, help="Disk in GB to leave images on", default=200)
+parser.add_argument(
+    "--wipe-all",
+    action="store_true",
+    help="Remove every image and container and empty the registry instead of collecting",
+)
+args = parser.parse_args()
 
-docker_server = DockerServer(remote_host_url=os.getenv("REMOTE_DOCKER_HOST"), remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000")
-try:
-    # Stop existing registry containers if they exist
-    try:
-        docker_server._remote_client.containers.get("swe-registry").stop()
-        docker_server._remote_client.containers.get("swe-registry").remove(force=True)
-        print("Removed existing swe-registry container")
-    except Exception as e:
-        print(f"No existing swe-registry container to remove: {e}")
-    
-    try:
-        docker_server._remote_client.containers.get("registry").stop()
-        docker_server._remote_client.containers.get("registry").remove(force=True)
-        print("Removed existing registry container")
-    except Exception as e:
-        print(f"No existing registry container to remove: {e}")
-    
-    # Start a new registry with delete enabled
-    docker_server._remote_client.containers.run(
-        "registry:2", 
-        name="swe-registry",
-        ports={"5000/tcp": 5000},
-        environment={"REGISTRY_STORAGE_DELETE_ENABLED": "true"},
-        detach=True
-    )
-    print("Started new registry with delete enabled")
-except Exception as e:
-    print(f"Failed to restart registry with delete enabled: {e}")
-
-# delete every image on the remote server except those with 'swe-server' or 'registry' in the name
-for image in docker_server._remote_client.images.list():
-    # Check if the image has tags and if any tag contains 'swe-server' or 'registry'
-    should_skip = False
-    if image.tags:
-        for tag in image.tags:
-            if 'swe-server' in tag or 'registry' in tag:
-                should_skip = True
-                break
-    
-    if not should_skip:
-        try:
-            docker_server._remote_client.images.remove(image.id, force=True)
-            print(f"Removed image: {image.id}")
-        except Exception as e:
-            print(f"Failed to remove image {image.id}: {e}")
+REGISTRY_URL = f"http://{os.getenv('DOCKER_HOST_IP')}:5000"
 
-# delete every container on the remote server except those with 'swe-server' or 'registry' in the name
-for container in docker_server._remote_client.containers.list(all=True):
-    if 'swe-server' not in container.name and 'registry' not in container.name:
-        try:
-            container.remove(force=True)
-            print(f"Removed container: {container.name}")
-        except Exception as e:
-            print(f"Failed to remove container {container.name}: {e}")
-            
-            
-            
-# delete every image on the remote server except those with 'swe-server' or 'registry' in the name
-for image in docker_server._local_client.images.list():
-    # Check if the image has tags and if any tag contains 'swe-server' or 'registry'
-    should_skip = False
-    if image.tags:
-        for tag in image.tags:
-            if 'swe-server' in tag or 'registry' in tag:
-                should_skip = True
-                break
-    
-    if not should_skip:
-        try:
-            docker_server._local_client.images.remove(image.id, force=True)
-            print(f"Removed image: {image.id}")
-        except Exception as e:
-            print(f"Failed to remove image {image.id}: {e}")
 
-# delete every container on the remote server except those with 'swe-server' or 'registry' in the name
-for container in docker_server._local_client.containers.list(all=True):
-    if 'swe-server' not in container.name and 'registry' not in container.name:
-        try:
-            container.remove(force=True)
-            print(f"Removed container: {container.name}")
-        except Exception as e:
-            print(f"Failed to remove container {container.name}: {e}")
-            
-import requests
-REGISTRY_URL = f"http://{os.getenv('DOCKER_HOST_IP')}:5000"
-            
 def list_registry_repositories():
     """Fetch a list of all repositories in the Docker registry using its API."""
     try:
@@ -139,9 +77,115 @@ def delete_registry_repository(repo_name):
     
     except Exception as e:
         print(f"Failed to delete repository {repo_name}: {e}")
+
 def clear_registry():
     """Delete all repositories from the Docker registry."""
     repos = list_registry_repositories()
     for repo in repos:
         delete_registry_repository(repo)
-clear_registry()
\ No newline at end of file
+
+
+def wipe_all(docker_server):
+    try:
+        # Stop existing registry containers if they exist
+        try:
+            docker_server._remote_client.containers.get("swe-registry").stop()
+            docker_server._remote_client.containers.get("swe-registry").remove(force=True)
+            print("Removed existing swe-registry container")
+        except Exception as e:
+            print(f"No existing swe-registry container to remove: {e}")
+
+        try:
+            docker_server._remote_client.containers.get("registry").stop()
+            docker_server._remote_client.containers.get("registry").remove(force=True)
+            print("Removed existing registry container")
+        except Exception as e:
+            print(f"No existing registry container to remove: {e}")
+
+        # Start a new registry with delete enabled
+        docker_server._remote_client.containers.run(
+            "registry:2", 
+            name="swe-registry",
+            ports={"5000/tcp": 5000},
+            environment={"REGISTRY_STORAGE_DELETE_ENABLED": "true"},
+            detach=True
+        )
+        print("Started new registry with delete enabled")
+    except Exception as e:
+        print(f"Failed to restart registry with delete enabled: {e}")
+
+    # delete every image on the remote server except those with 'swe-server' or 'registry' in the name
+    for image in docker_server._remote_client.images.list():
+        # Check if the image has tags and if any tag contains 'swe-server' or 'registry'
+        should_skip = False
+        if image.tags:
+            for tag in image.tags:
+                if 'swe-server' in tag or 'registry' in tag:
+                    should_skip = True
+                    break
+
+        if not should_skip:
+            try:
+                docker_server._remote_client.images.remove(image.id, force=True)
+                print(f"Removed image: {image.id}")
+            except Exception as e:
+                print(f"Failed to remove image {image.id}: {e}")
+
+    # delete every container on the remote server except those with 'swe-server' or 'registry' in the name
+    for container in docker_server._remote_client.containers.list(all=True):
+        if 'swe-server' not in container.name and 'registry' not in container.name:
+            try:
+                container.remove(force=True)
+                print(f"Removed container: {container.name}")
+            except Exception as e:
+                print(f"Failed to remove container {container.name}: {e}")
+
+
+
+    # delete every image on the remote server except those with 'swe-server' or 'registry' in the name
+    for image in docker_server._local_client.images.list():
+        # Check if the image has tags and if any tag contains 'swe-server' or 'registry'
+        should_skip = False
+        if image.tags:
+            for tag in image.tags:
+                if 'swe-server' in tag or 'registry' in tag:
+                    should_skip = True
+                    break
+
+        if not should_skip:
+            try:
+                docker_server._local_client.images.remove(image.id, force=True)
+                print(f"Removed image: {image.id}")
+            except Exception as e:
+                print(f"Failed to remove image {image.id}: {e}")
+
+    # delete every container on the remote server except those with 'swe-server' or 'registry' in the name
+    for container in docker_server._local_client.containers.list(all=True):
+        if 'swe-server' not in container.name and 'registry' not in container.name:
+            try:
+                container.remove(force=True)
+                print(f"Removed container: {container.name}")
+            except Exception as e:
+                print(f"Failed to remove container {container.name}: {e}")
+
+    clear_registry()
+
+
+IMAGE_BUILDS.load(os.path.join(args.full_path, f"image_builds_{COMPETITION_ID}.pkl"))
+IMAGE_GC.load(os.path.join(args.full_path, f"image_usage_{COMPETITION_ID}.pkl"))
+docker_server = DockerServer(remote_host_url=os.getenv("REMOTE_DOCKER_HOST"), remote_host_registry=f"{os.getenv('DOCKER_HOST_IP')}:5000")
+
+if args.wipe_all:
+    wipe_all(docker_server)
+    # nothing is built anymore
+    for image_name in list(IMAGE_BUILDS.built):
+        IMAGE_BUILDS.forget(image_name)
+    sys.exit(0)
+
+if not IMAGE_GC.protected:
+    sys.exit(
+        f"No task set images are recorded in {args.full_path}, refusing to collect. "
+        "Run the validator until its first collection or pass --wipe-all."
+    )
+evicted = IMAGE_GC.collect(docker_server, set(IMAGE_GC.protected), int(args.quota_gb * 1024**3))
+print(f"Evicted {len(evicted)} images, kept {len(IMAGE_GC.protected)} images of the task sets")
@@ -0,0 +1,150 @@
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from coding.finetune.pool import IDLE_TIMEOUT, ContainerPool
+
+
+class FakeContainer:
+    def __init__(self, client, **kwargs):
+        self.client = client
+        self.id = uuid.uuid4().hex
+        self.name = kwargs["name"]
+        self.volumes = kwargs.get("volumes")
+        self.labels = kwargs.get("labels")
+        self.resets = []
+        self.removed = False
+
+    def start(self):
+        pass
+
+    def exec_run(self, cmd, workdir=None):
+        if isinstance(cmd, list):
+            # the reset script prints the commit's tree and the working tree's
+            self.resets.append(cmd[-1])
+            if not self.client.reset_ok:
+                return 1, b""
+            return 0, b"tree\ntree\n"
+        return 0, b""
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeClient:
+    def __init__(self, reset_ok=True):
+        self.api = SimpleNamespace(base_url="unix://fake.sock")
+        self.reset_ok = reset_ok
+        self.created = []
+        self.containers = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        container = FakeContainer(self, **kwargs)
+        self.created.append(container)
+        return container
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition was not met in time")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool():
+    pool = ContainerPool(size=2)
+    yield pool
+    pool.clear()
+
+
+def test_acquired_container_is_reset_to_the_commit(pool):
+    client = FakeClient()
+    container = pool.acquire(client, "image", "abc123")
+    assert "git reset --hard -q abc123" in container.resets[-1]
+    assert pool.owns(container.id)
+
+
+def test_released_container_is_removed_not_reused(pool):
+    client = FakeClient()
+    container = pool.acquire(client, "image", "abc123")
+    pool.release(container)
+    wait_for(lambda: container.removed)
+    assert not pool.owns(container.id)
+    assert pool.acquire(client, "image", "abc123") is not container
+
+
+def test_pool_warms_idle_containers_at_the_commit(pool):
+    client = FakeClient()
+    pool.acquire(client, "image", "abc123")
+    wait_for(lambda: len(client.created) == 3)
+    wait_for(lambda: len(pool._idle[(client.api.base_url, "image")]) == 2)
+    warm = pool.acquire(client, "image", "abc123")
+    assert warm in client.created[1:]
+    # the warm container was already at the commit, so it is not reset again
+    assert len(warm.resets) == 1
+
+
+def test_container_that_cannot_be_reset_is_discarded(pool):
+    client = FakeClient(reset_ok=False)
+    with pytest.raises(RuntimeError):
+        pool.acquire(client, "image", "abc123")
+    wait_for(lambda: all(container.removed for container in client.created))
+    assert len(client.created) == 3
+
+
+def test_containers_with_volumes_are_created_for_the_call(pool):
+    client = FakeClient()
+    volumes = {"logic": {"bind": "/app/code", "mode": "ro"}}
+    container = pool.acquire(client, "image", "abc123", volumes=volumes, labels={"role": "logic"})
+    assert container.volumes == volumes
+    assert container.labels == {"role": "logic"}
+    pool.release(container)
+    wait_for(lambda: container.removed)
+
+
+def test_clear_removes_idle_containers(pool):
+    client = FakeClient()
+    pool.acquire(client, "image", "abc123")
+    wait_for(lambda: len(pool._idle.get((client.api.base_url, "image"), [])) == 2)
+    idle = list(pool._idle[(client.api.base_url, "image")])
+    pool.clear()
+    assert all(container.container.removed for container in idle)
+
+
+def test_release_removes_idle_containers_past_the_timeout(pool):
+    client = FakeClient()
+    container = pool.acquire(client, "image", "abc123")
+    wait_for(lambda: len(pool._idle.get((client.api.base_url, "image"), [])) == 2)
+    idle = list(pool._idle[(client.api.base_url, "image")])
+    for pooled in idle:
+        pooled.last_used -= IDLE_TIMEOUT + 1
+    pool.release(container)
+    wait_for(lambda: all(pooled.container.removed for pooled in idle))
+    assert pool._idle[(client.api.base_url, "image")] == []
+
+
+def test_retain_removes_idle_containers_of_other_images(pool):
+    client = FakeClient()
+    pool.acquire(client, "old", "abc123")
+    pool.acquire(client, "new", "def456")
+    wait_for(lambda: len(pool._idle.get((client.api.base_url, "old"), [])) == 2)
+    wait_for(lambda: len(pool._idle.get((client.api.base_url, "new"), [])) == 2)
+    old = list(pool._idle[(client.api.base_url, "old")])
+    pool.retain(["new"])
+    wait_for(lambda: all(pooled.container.removed for pooled in old))
+    assert len(pool._idle[(client.api.base_url, "new")]) == 2
+
+
+def test_close_waits_for_warm_ups_and_removes_every_idle_container(pool):
+    client = FakeClient()
+    container = pool.acquire(client, "image", "abc123")
+    pool.release(container)
+    pool.close()
+    assert len(client.created) == 3
+    assert all(created.removed for created in client.created)
+    # the pool can be used again
+    assert pool.acquire(client, "image", "abc123") is client.created[3]
@@ -0,0 +1,102 @@
+import io
+import tarfile
+from types import SimpleNamespace
+
+import pytest
+from swebench.harness.utils import EvaluationError
+
+import coding.tasks.swe as swe
+from coding.tasks.swe import (
+    GRADE_LOG_PATH,
+    GRADE_RESULT_MARKER,
+    GRADE_SCRIPT_PATH,
+    eval_logger,
+    grade_in_container,
+    parse_grade_output,
+)
+
+
+class FakeContainer:
+    def __init__(self, output: bytes, files=None):
+        self.id = "container"
+        self.files = files or {}
+        self.archives = []
+        self.execs = []
+        self.client = SimpleNamespace(
+            api=SimpleNamespace(exec_create=self._exec_create, exec_start=self._exec_start)
+        )
+        self.output = output
+
+    def put_archive(self, path, data):
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            self.archives.append(
+                {member.name: tar.extractfile(member).read().decode() for member in tar}
+            )
+
+    def get_archive(self, path):
+        data = self.files[path]
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode="w") as tar:
+            info = tarfile.TarInfo(name=path.rsplit("/", 1)[-1])
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+        return [archive.getvalue()], {"size": len(data)}
+
+    def _exec_create(self, container_id, cmd):
+        self.execs.append(cmd)
+        return {"Id": "exec"}
+
+    def _exec_start(self, exec_id, stream=False):
+        yield self.output
+
+
+def test_patch_and_scripts_are_copied_in_one_archive_and_run_in_one_exec():
+    container = FakeContainer(
+        f'error: patch failed\n{GRADE_RESULT_MARKER} {{"applied": false, "apply_command": null, "eval_exit_code": null}}\n'.encode()
+    )
+    test_spec = SimpleNamespace(instance_id="instance", eval_script="pytest tests")
+    pred = {"instance_id": "instance", "model_patch": "diff --git a/x b/x\n"}
+    with pytest.raises(EvaluationError):
+        grade_in_container(container, test_spec, pred, 60, eval_logger())
+    assert len(container.archives) == 1
+    files = container.archives[0]
+    assert set(files) == {"tmp/patch.diff", "eval.sh", GRADE_SCRIPT_PATH.lstrip("/")}
+    assert files["tmp/patch.diff"] == pred["model_patch"]
+    assert files["eval.sh"] == "pytest tests"
+    assert container.execs == [f"/bin/bash {GRADE_SCRIPT_PATH}"]
+
+
+def test_test_log_is_read_from_the_container_not_the_exec_output(monkeypatch):
+    # a log far larger than the exec output capture keeps the status lines in its middle
+    test_log = "x" * (8 * 1024 * 1024) + "\ntest_a PASSED\n" + "y" * (8 * 1024 * 1024)
+    container = FakeContainer(
+        f'{GRADE_RESULT_MARKER} {{"applied": true, "apply_command": "git apply --verbose", "eval_exit_code": 0}}\n'.encode(),
+        files={GRADE_LOG_PATH: test_log.encode()},
+    )
+    logs = []
+
+    def get_eval_report(test_spec, prediction, test_log_path, include_tests_status):
+        logs.append(open(test_log_path).read())
+        return {test_spec.instance_id: {"resolved": True}}
+
+    monkeypatch.setattr(swe, "get_eval_report", get_eval_report)
+    test_spec = SimpleNamespace(instance_id="instance", eval_script="pytest tests")
+    pred = {"instance_id": "instance", "model_patch": "diff --git a/x b/x\n"}
+    grade_in_container(container, test_spec, pred, 60, eval_logger())
+    assert logs == [test_log]
+
+
+def test_grade_output_is_split_into_test_output_and_result():
+    output = (
+        "test_a PASSED\n"
+        f'{GRADE_RESULT_MARKER} {{"applied": true, "apply_command": "git apply --verbose", "eval_exit_code": 1}}\n'
+    )
+    test_output, result = parse_grade_output(output)
+    assert test_output == "test_a PASSED\n"
+    assert result == {"applied": True, "apply_command": "git apply --verbose", "eval_exit_code": 1}
+
+
+def test_grade_output_without_a_result_did_not_finish():
+    assert parse_grade_output("test_a PASSED\n") == ("test_a PASSED\n", None)
+    output = f"{GRADE_RESULT_MARKER} {{not json"
+    assert parse_grade_output(output) == (output, None)
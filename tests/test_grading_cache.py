@@ -0,0 +1,67 @@
+import threading
+
+from coding.tasks.swe import GradingCache
+
+
+def test_identical_patches_are_graded_once():
+    cache = GradingCache()
+    calls = []
+    grade = lambda: calls.append(1) or 1
+    assert cache.get_or_grade("instance", "diff", grade) == 1
+    # line endings and surrounding whitespace do not make a patch different
+    assert cache.get_or_grade("instance", "diff\r\n", grade) == 1
+    assert len(calls) == 1
+
+
+def test_concurrent_requests_wait_for_the_first_grader():
+    cache = GradingCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def grade():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return 1
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_grade("instance", "diff", grade)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == [1, 1, 1, 1]
+    assert len(calls) == 1
+
+
+def test_results_that_are_not_definitive_are_not_cached():
+    cache = GradingCache()
+    assert cache.get_or_grade("instance", "diff", lambda: None) == 0
+    assert cache.get_or_grade("instance", "diff", lambda: 1) == 1
+
+
+def test_least_recently_used_results_are_dropped():
+    cache = GradingCache(max_entries=2)
+    cache.get_or_grade("instance", "a", lambda: 1)
+    cache.get_or_grade("instance", "b", lambda: 1)
+    cache.get_or_grade("instance", "a", lambda: 0)
+    cache.get_or_grade("instance", "c", lambda: 1)
+    assert len(cache.results) == 2
+    # "a" was used more recently than "b", so "b" was dropped
+    assert cache.get_or_grade("instance", "a", lambda: 0) == 1
+    assert cache.get_or_grade("instance", "b", lambda: 0) == 0
+
+
+def test_forget_drops_the_results_of_rotated_out_instances():
+    cache = GradingCache()
+    cache.get_or_grade("old", "diff", lambda: 1)
+    cache.get_or_grade("new", "diff", lambda: 1)
+    cache.forget(["old"])
+    assert cache.get_or_grade("old", "diff", lambda: 0) == 0
+    assert cache.get_or_grade("new", "diff", lambda: 0) == 1
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import docker
+import pytest
+
+from coding.helpers.containers import IMAGE_BUILDS, ImageGC, RemoteHost, image_key
+
+GB = 1024**3
+REGISTRY = "10.0.0.1:5000"
+
+
+class FakeImages:
+    def __init__(self, images, in_use=()):
+        # tag -> size
+        self.images = dict(images)
+        self.in_use = set(in_use)
+        self.removed = []
+
+    def list(self):
+        return [
+            SimpleNamespace(tags=[tag], attrs={"Size": size}) for tag, size in self.images.items()
+        ]
+
+    def remove(self, tag):
+        if tag in self.in_use:
+            raise docker.errors.APIError("image is being used by a running container")
+        del self.images[tag]
+        self.removed.append(tag)
+
+
+def fake_client(images, in_use=()):
+    return SimpleNamespace(images=FakeImages(images, in_use))
+
+
+@pytest.fixture
+def gc():
+    gc = ImageGC()
+    gc.last_used = {"swe-eval-a:v1": 1, "swe-eval-b:v1": 2, "swe-eval-c:v1": 3}
+    return gc
+
+
+def test_image_key_strips_the_registry():
+    assert image_key(f"{REGISTRY}/swe-eval-a:v1") == "swe-eval-a:v1"
+    assert image_key("localhost/swe-eval-a:v1") == "swe-eval-a:v1"
+    assert image_key("swe-eval-a:v1") == "swe-eval-a:v1"
+    assert image_key("brokespace/swe-env:v1") == "brokespace/swe-env:v1"
+
+
+def test_least_recently_used_images_are_evicted_until_under_quota(gc):
+    client = fake_client(
+        {"swe-eval-a:v1": GB, "swe-eval-b:v1": GB, "swe-eval-c:v1": GB, "other:latest": 10 * GB}
+    )
+    assert gc._collect_daemon(client, set(), int(1.5 * GB)) == ["swe-eval-a:v1", "swe-eval-b:v1"]
+    # only evaluation images are counted and collected
+    assert "other:latest" in client.images.images
+
+
+def test_protected_and_in_use_images_are_kept(gc):
+    client = fake_client(
+        {"swe-eval-a:v1": GB, "swe-eval-b:v1": GB, "swe-eval-c:v1": GB},
+        in_use={"swe-eval-a:v1"},
+    )
+    assert gc._collect_daemon(client, {"swe-eval-b:v1"}, GB) == ["swe-eval-c:v1"]
+    assert set(client.images.images) == {"swe-eval-a:v1", "swe-eval-b:v1"}
+
+
+def test_collect_forgets_evicted_images(gc):
+    local = fake_client({"swe-eval-a:v1": GB})
+    remote = fake_client({f"{REGISTRY}/swe-eval-a:v1": GB, f"{REGISTRY}/swe-eval-c:v1": GB})
+    host = RemoteHost("tcp://gc-test-host:2375")
+    host.clients = SimpleNamespace(primary=remote)
+    host.images = {f"{REGISTRY}/swe-eval-a:v1", f"{REGISTRY}/swe-eval-c:v1"}
+    docker_server = SimpleNamespace(
+        _local_client=local, remote_hosts=[host], remote_host_registry=None
+    )
+    IMAGE_BUILDS.built[f"{REGISTRY}/swe-eval-a:v1"] = {"built_at": 0}
+    try:
+        evicted = gc.collect(docker_server, {f"{REGISTRY}/swe-eval-c:v1"}, 0)
+        assert evicted == ["swe-eval-a:v1", "swe-eval-a:v1"]
+        # the host no longer claims the image, so the next lease pulls it again
+        assert host.images == {f"{REGISTRY}/swe-eval-c:v1"}
+        assert f"{REGISTRY}/swe-eval-a:v1" not in IMAGE_BUILDS.built
+        assert gc.protected == {"swe-eval-c:v1"}
+    finally:
+        IMAGE_BUILDS.built.pop(f"{REGISTRY}/swe-eval-a:v1", None)
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import docker
+
+from coding.helpers.containers import DockerServer
+
+REGISTRY = "10.0.0.1:5000"
+LOCAL_TAG = "swe-eval-a:v1"
+REMOTE_TAG = f"{REGISTRY}/{LOCAL_TAG}"
+
+
+class FakeImages:
+    def __init__(self, images, registry):
+        # tag -> image id
+        self.images = dict(images)
+        self.registry = registry
+        self.pushed = []
+        self.pulled = []
+
+    def get(self, tag):
+        if tag not in self.images:
+            raise docker.errors.ImageNotFound(tag)
+        image_id = self.images[tag]
+        return SimpleNamespace(
+            id=image_id, tag=lambda new_tag: self.images.update({new_tag: image_id})
+        )
+
+    def get_registry_data(self, tag):
+        if tag not in self.registry:
+            raise docker.errors.NotFound(tag)
+        return SimpleNamespace(id=self.registry[tag])
+
+    def push(self, tag, stream=False, decode=False):
+        self.pushed.append(tag)
+        self.registry[tag] = self.images[tag]
+        return iter([{"status": "Pushed"}])
+
+    def pull(self, tag):
+        self.pulled.append(tag)
+        self.images[tag] = self.registry[tag]
+
+
+def docker_server(local_images, remote_images, registry):
+    server = DockerServer.__new__(DockerServer)
+    server.remote_host_registry = REGISTRY
+    server._local_client = SimpleNamespace(images=FakeImages(local_images, registry))
+    server._remote_client = SimpleNamespace(images=FakeImages(remote_images, registry))
+    return server
+
+
+def test_matching_image_in_the_registry_is_not_transferred():
+    server = docker_server({LOCAL_TAG: "sha"}, {REMOTE_TAG: "sha"}, {REMOTE_TAG: "sha"})
+    server.load_image_remote(LOCAL_TAG)
+    assert server._local_client.images.pushed == []
+    assert server._remote_client.images.pushed == []
+    assert server._remote_client.images.pulled == []
+
+
+def test_image_missing_from_the_registry_is_pushed_by_the_remote_daemon():
+    registry = {}
+    server = docker_server({LOCAL_TAG: "sha"}, {REMOTE_TAG: "sha"}, registry)
+    server.load_image_remote(LOCAL_TAG)
+    assert server._remote_client.images.pushed == [REMOTE_TAG]
+    assert server._local_client.images.pushed == []
+    assert registry == {REMOTE_TAG: "sha"}
+
+
+def test_image_missing_from_the_remote_daemon_is_pushed_and_pulled():
+    registry = {}
+    server = docker_server({LOCAL_TAG: "sha"}, {}, registry)
+    server.load_image_remote(LOCAL_TAG)
+    assert server._local_client.images.pushed == [REMOTE_TAG]
+    assert server._remote_client.images.pulled == [REMOTE_TAG]
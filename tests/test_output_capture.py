@@ -0,0 +1,24 @@
+from coding.finetune.dockerutil import OutputCapture
+
+
+def test_small_output_is_kept_whole():
+    capture = OutputCapture(head_bytes=8, tail_bytes=8)
+    for chunk in (b"hello ", b"world"):
+        capture.write(chunk)
+    assert not capture.truncated
+    assert capture.getvalue() == b"hello world"
+
+
+def test_output_between_head_and_tail_is_dropped():
+    capture = OutputCapture(head_bytes=4, tail_bytes=4)
+    for i in range(100):
+        capture.write(str(i % 10).encode() * 3)
+    assert capture.total_bytes == 300
+    assert capture.truncated
+    assert capture.getvalue() == b"0001\n... [292 bytes truncated] ...\n8999"
+
+
+def test_chunks_larger_than_the_buffers():
+    capture = OutputCapture(head_bytes=3, tail_bytes=3)
+    capture.write(b"abcdefghij")
+    assert capture.getvalue() == b"abc\n... [4 bytes truncated] ...\nhij"
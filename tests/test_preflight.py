@@ -0,0 +1,81 @@
+import subprocess
+
+import pytest
+
+from coding.schemas import ChangedFile
+from coding.tasks.swe import create_diff, preflight_patch
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "module.py").write_text("def add(a, b):\n    return a - b\n")
+    (tmp_path / "pkg" / "test_module.py").write_text("def test_add():\n    pass\n")
+    for command in (
+        ["git", "init", "-q"],
+        ["git", "add", "-A"],
+        ["git", "-c", "user.name=test", "-c", "user.email=test@test", "commit", "-q", "-m", "base"],
+    ):
+        subprocess.run(command, cwd=tmp_path, check=True)
+    return tmp_path
+
+
+def diff_for(file_name, old_content, new_content):
+    return create_diff(
+        [ChangedFile(file_name=file_name, old_content=old_content, new_content=new_content)]
+    )
+
+
+def test_patch_that_applies_passes(repo):
+    diff = diff_for(
+        "pkg/module.py",
+        "def add(a, b):\n    return a - b\n",
+        "def add(a, b):\n    return a + b\n",
+    )
+    assert preflight_patch(diff, str(repo)) == (True, "")
+
+
+def test_empty_patch_fails(repo):
+    ok, reason = preflight_patch("", str(repo))
+    assert not ok
+    assert "does not change any files" in reason
+
+
+def test_patch_with_stale_context_fails(repo):
+    diff = diff_for(
+        "pkg/module.py",
+        "def sub(a, b):\n    return a * b\n",
+        "def sub(a, b):\n    return a / b\n",
+    )
+    ok, reason = preflight_patch(diff, str(repo))
+    assert not ok
+    assert "does not apply" in reason
+
+
+def test_patch_touching_a_test_file_fails(repo):
+    diff = diff_for(
+        "pkg/test_module.py",
+        "def test_add():\n    pass\n",
+        "def test_add():\n    assert True\n",
+    )
+    ok, reason = preflight_patch(diff, str(repo))
+    assert not ok
+    assert "test file" in reason
+
+
+def test_malformed_patch_fails(repo):
+    ok, reason = preflight_patch("diff --git a/x b/x\n@@ garbage\n", str(repo))
+    assert not ok
+
+
+def test_missing_apply_command_leaves_the_patch_to_the_container(repo, monkeypatch):
+    monkeypatch.setattr(
+        "coding.tasks.swe.PREFLIGHT_APPLY_CMDS",
+        [["git", "apply", "--check"], ["no-such-patch-binary", "--dry-run"]],
+    )
+    diff = diff_for(
+        "pkg/module.py",
+        "def sub(a, b):\n    return a * b\n",
+        "def sub(a, b):\n    return a / b\n",
+    )
+    assert preflight_patch(diff, str(repo)) == (True, "")
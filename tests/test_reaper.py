@@ -0,0 +1,68 @@
+import time
+from types import SimpleNamespace
+
+from coding.finetune.reaper import (
+    INSTANCE_LABEL,
+    RUN_LABEL,
+    ContainerReaper,
+    container_labels,
+)
+
+
+def fake_client(*containers):
+    def list_containers(all=False, sparse=False, filters=None):
+        if filters is None:
+            return list(containers)
+        return [c for c in containers if filters["label"] in (c.attrs.get("Labels") or {})]
+
+    return SimpleNamespace(containers=SimpleNamespace(list=list_containers))
+
+
+def fake_container(container_id, labels, age, image="swe-eval-a:v1"):
+    return SimpleNamespace(
+        id=container_id,
+        attrs={"Labels": labels, "Image": image, "Created": time.time() - age},
+    )
+
+
+def test_containers_of_a_previous_run_of_this_validator_are_stale():
+    reaper = ContainerReaper()
+    labels = container_labels("pool")
+    client = fake_client(
+        fake_container("current", labels, 0),
+        fake_container("restart", {**labels, RUN_LABEL: "previous"}, 0),
+    )
+    assert reaper.stale(client) == ["restart"]
+
+
+def test_containers_of_this_run_are_stale_once_old_and_not_owned():
+    reaper = ContainerReaper(grace=60)
+    reaper.add_owner(lambda container_id: container_id == "owned")
+    labels = container_labels("pool")
+    client = fake_client(
+        fake_container("young", labels, 0),
+        fake_container("owned", labels, 120),
+        fake_container("leaked", labels, 120),
+    )
+    assert reaper.stale(client) == ["leaked"]
+
+
+def test_containers_of_other_validators_are_only_stale_once_very_old():
+    reaper = ContainerReaper(foreign_grace=3600)
+    labels = {**container_labels("pool"), INSTANCE_LABEL: "other", RUN_LABEL: "other"}
+    client = fake_client(
+        fake_container("running", labels, 60),
+        fake_container("abandoned", labels, 7200),
+    )
+    assert reaper.stale(client) == ["abandoned"]
+
+
+def test_legacy_sweep_only_covers_unlabelled_evaluation_containers():
+    reaper = ContainerReaper()
+    client = fake_client(
+        fake_container("legacy", {}, 60),
+        fake_container("registry", {}, 60, image="registry:2"),
+        fake_container("labelled", container_labels("pool"), 60),
+        fake_container("new", {}, -60),
+    )
+    assert reaper.legacy(client) == ["legacy"]
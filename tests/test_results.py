@@ -0,0 +1,83 @@
+import pickle
+from types import SimpleNamespace
+
+from coding.finetune.dockerutil import DEFAULT_RUNNER_TIMEOUT
+from coding.finetune.results import (
+    MIN_RUNNER_TIMEOUT,
+    MIN_RUNTIME_SAMPLES,
+    ResultStore,
+    TaskTimings,
+)
+
+
+def make_config(path):
+    return SimpleNamespace(neuron=SimpleNamespace(full_path=str(path)))
+
+
+def make_task(instance_id):
+    return SimpleNamespace(row={"instance_id": instance_id})
+
+
+def test_result_store_survives_a_restart(tmp_path):
+    store = ResultStore(make_config(tmp_path))
+    store.set("logic", "instance-1", 1.0)
+    store.set("other", "instance-1", 0.0)
+
+    reloaded = ResultStore(make_config(tmp_path))
+    assert reloaded.get("logic", "instance-1") == 1.0
+    assert reloaded.get("logic", "instance-2") is None
+
+    reloaded.remove_logic("logic")
+    assert ResultStore(make_config(tmp_path)).get("logic", "instance-1") is None
+    assert len(reloaded) == 1
+
+
+def test_task_timings_order_longest_first(tmp_path):
+    timings = TaskTimings(make_config(tmp_path))
+    timings.record("slow", "generation", 100)
+    timings.record("slow", "grading", 50)
+    timings.record("fast", "generation", 10)
+    jobs = [(0, make_task("fast")), (1, make_task("unknown")), (2, make_task("slow"))]
+    # an untimed task is assumed to take the average of the timed ones
+    assert [task_idx for task_idx, _ in timings.sort_longest_first(jobs)] == [2, 1, 0]
+
+
+def test_task_timings_are_a_moving_average(tmp_path):
+    timings = TaskTimings(make_config(tmp_path), alpha=0.5)
+    timings.record("task", "grading", 10)
+    timings.record("task", "grading", 20)
+    assert timings.expected("task") == 15
+    timings.save()
+    assert TaskTimings(make_config(tmp_path)).expected("task") == 15
+
+
+def test_runner_timeout_follows_the_runtime_distribution(tmp_path):
+    timings = TaskTimings(make_config(tmp_path))
+    assert timings.runner_timeout("task") == DEFAULT_RUNNER_TIMEOUT
+    for duration in [100] * 19 + [400]:
+        timings.record("task", "generation", duration)
+    # the 95th percentile of 20 samples is the 19th fastest
+    assert timings.runner_timeout("task") == MIN_RUNNER_TIMEOUT
+    for duration in [400] * 10:
+        timings.record("task", "generation", duration)
+    assert timings.runner_timeout("task") == 400 * 1.5 + 60
+    for duration in [2000] * 10:
+        timings.record("task", "generation", duration)
+    assert timings.runner_timeout("task") == DEFAULT_RUNNER_TIMEOUT
+
+
+def test_runtime_samples_survive_a_restart(tmp_path):
+    timings = TaskTimings(make_config(tmp_path))
+    for _ in range(MIN_RUNTIME_SAMPLES):
+        timings.record("task", "generation", 500)
+    timings.save()
+    assert TaskTimings(make_config(tmp_path)).runner_timeout("task") == 500 * 1.5 + 60
+
+
+def test_task_timings_load_records_without_samples(tmp_path):
+    timings = TaskTimings(make_config(tmp_path))
+    with open(timings.store_file, "wb") as f:
+        pickle.dump({"task": {"generation": 10.0}}, f)
+    reloaded = TaskTimings(make_config(tmp_path))
+    assert reloaded.expected("task") == 10.0
+    assert reloaded.runner_timeout("task") == DEFAULT_RUNNER_TIMEOUT
@@ -0,0 +1,93 @@
+import time
+import threading
+
+import pytest
+
+from coding.finetune.scheduler import EvaluationScheduler
+
+
+def test_trackers_are_served_round_robin():
+    scheduler = EvaluationScheduler(max_workers=1, max_per_tracker=None)
+    scheduler.add("a", [(0, "a0"), (1, "a1")])
+    scheduler.add("b", [(0, "b0"), (1, "b1")])
+    order = []
+    scheduler.run(lambda key, task_idx, task: order.append(task))
+    assert order == ["a0", "b0", "a1", "b1"]
+
+
+def test_lower_priority_value_is_served_first():
+    scheduler = EvaluationScheduler(max_workers=1, max_per_tracker=None)
+    scheduler.add("low", [(0, "low0"), (1, "low1")], priority=1)
+    scheduler.add("high", [(0, "high0"), (1, "high1")], priority=0)
+    order = []
+    scheduler.run(lambda key, task_idx, task: order.append(task))
+    assert order == ["high0", "high1", "low0", "low1"]
+
+
+def test_in_flight_tasks_are_capped_per_tracker():
+    scheduler = EvaluationScheduler(max_workers=8, max_per_tracker=2)
+    scheduler.add("a", [(i, i) for i in range(6)])
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def process(key, task_idx, task):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+
+    scheduler.run(process)
+    assert running["max"] == 2
+
+
+def test_results_and_completion_are_reported():
+    scheduler = EvaluationScheduler(max_workers=4)
+    scheduler.add("a", [(1, 10), (0, 20)])
+    results = []
+    completed = []
+    scheduler.run(
+        lambda key, task_idx, task: task * 2,
+        on_result=lambda queue, task_idx, result: results.append((task_idx, result)),
+        on_complete=lambda queue: completed.append((queue.key, queue.scores)),
+    )
+    assert sorted(results) == [(0, 40), (1, 20)]
+    # scores are ordered by task index, not by completion
+    assert completed == [("a", [40, 20])]
+    assert len(scheduler) == 0
+
+
+def test_stopped_tracker_dispatches_no_more_tasks():
+    scheduler = EvaluationScheduler(max_workers=1)
+    scheduler.add("a", [(i, i) for i in range(5)])
+    processed = []
+    completed = []
+
+    def on_result(queue, task_idx, result):
+        if len(queue.results) == 2:
+            queue.stop(0.5)
+
+    scheduler.run(
+        lambda key, task_idx, task: processed.append(task),
+        on_result=on_result,
+        on_complete=completed.append,
+    )
+    assert processed == [0, 1]
+    assert completed[0].stopped
+    assert completed[0].stopped_bound == 0.5
+
+
+def test_tracker_cannot_be_added_twice():
+    scheduler = EvaluationScheduler()
+    scheduler.add("a", [(0, "a0")])
+    with pytest.raises(ValueError):
+        scheduler.add("a", [(0, "a0")])
+
+
+def test_tasks_in_use_covers_pending_and_finished_tasks():
+    scheduler = EvaluationScheduler()
+    queue = scheduler.add("a", [(0, "a0"), (1, "a1")])
+    scheduler.add("b", [(0, "b0")])
+    queue.pending.pop(0)
+    assert sorted(scheduler.tasks_in_use()) == ["a0", "a1", "b0"]